@@ -0,0 +1,141 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# raiz do repositório no path, para importar o pacote financeiro
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from financeiro.calendario import calendario_br
+
+# Dados sintéticos para os benchmarks: carteiras no layout names_raw e históricos
+# de CDI/IPCA no formato do SGS. Tudo é determinístico a partir da semente.
+
+path_folder_fixtures=os.path.join(os.path.dirname(os.path.realpath(__file__)),'fixtures')
+
+NAMES_RAW = ['EMISSOR','TIPO_PAPEL','TIPO_RENDIMENTO','OBJETIVO','APORTE','TAXA_AA','DATA_INICIO','DATA_RESGATE']
+
+EMISSORES = ['Daycoval', 'Banco Inter', 'BTG Pactual', 'XP', 'C6', 'Banco Master', 'Sofisa', 'Tesouro Nacional']
+PAPEIS = {'CDB': 0.55, 'LCI': 0.15, 'LCA': 0.15, 'Tesouro': 0.10, 'Debênture': 0.05}
+RENDIMENTOS = {'CDI': 0.55, 'IPCA+taxa': 0.20, 'Pré': 0.22, 'Outro': 0.03}
+OBJETIVOS = ['Reserva de emergência', 'Aposentadoria', 'Casa', 'Viagem', 'Educação']
+PRAZOS_ANOS = {0.5: 0.10, 1: 0.20, 2: 0.30, 3: 0.20, 5: 0.15, 10: 0.05}
+
+#   Período dos históricos congelados
+INICIO_HISTORICO = '2017-01-01'
+FIM_HISTORICO = '2024-07-12'
+DATA_REFERENCIA = '2024-07-09'
+
+
+def _escolher(rng, opcoes: dict, n: int) -> np.ndarray:
+    return rng.choice(list(opcoes), n, p=np.array(list(opcoes.values())) / sum(opcoes.values()))
+
+
+def gerar_carteira(n: int, seed: int = 0, data_referencia: str = DATA_REFERENCIA) -> pd.DataFrame:
+    """
+    Synthetic ledger with the names_raw columns, as read from InvestNovo_*.csv.
+
+    Start dates spread over the 7 years before data_referencia (more recent
+    ones more frequent), usual fixed income terms, rates by type in realistic
+    ranges (CDI as a fraction of the CDI, IPCA+ and Pré as annual rates), dates
+    in dd/mm/YYYY with some ISO ones and about 5% of 'Resgatado' positions.
+
+    Args:
+        n (int): Number of positions.
+        seed (int): Random seed.
+        data_referencia (str): Date the ledger is "exported" (YYYY-MM-DD).
+
+    Returns:
+        pd.DataFrame: The ledger.
+    """
+    rng = np.random.default_rng(seed)
+    referencia = np.datetime64(data_referencia, 'D')
+
+    rendimento = _escolher(rng, RENDIMENTOS, n)
+    taxa = np.select([rendimento == 'CDI', rendimento == 'IPCA+taxa', rendimento == 'Pré'],
+                     [rng.choice(np.arange(0.90, 1.31, 0.01).round(2), n),
+                      rng.normal(0.060, 0.008, n).clip(0.035, 0.085).round(4),
+                      rng.normal(0.115, 0.015, n).clip(0.08, 0.16).round(4)],
+                     default=rng.uniform(0.05, 0.12, n).round(4))
+
+    idade = np.minimum(rng.exponential(700, n), 7 * 365).astype(int)
+    inicio = referencia - idade.astype('timedelta64[D]')
+    prazo = (_escolher(rng, PRAZOS_ANOS, n).astype(float) * 365).astype(int)
+    resgate = inicio + prazo.astype('timedelta64[D]')
+
+    def formatar(datas):
+        texto = pd.Series(pd.to_datetime(datas).strftime('%d/%m/%Y'))
+        iso = rng.random(n) < 0.1
+        texto[iso] = pd.to_datetime(datas[iso]).strftime('%Y-%m-%d')
+        return texto
+
+    data_resgate = formatar(resgate)
+    data_resgate[rng.random(n) < 0.05] = 'Resgatado'
+
+    return pd.DataFrame({
+        'EMISSOR': rng.choice(EMISSORES, n),
+        'TIPO_PAPEL': _escolher(rng, PAPEIS, n),
+        'TIPO_RENDIMENTO': rendimento,
+        'OBJETIVO': rng.choice(OBJETIVOS, n),
+        'APORTE': (rng.lognormal(9.5, 1.0, n) // 100 * 100).clip(100),
+        'TAXA_AA': taxa,
+        'DATA_INICIO': formatar(inicio),
+        'DATA_RESGATE': data_resgate,
+    })[NAMES_RAW]
+
+
+def gerar_historico_cdi(inicio: str = INICIO_HISTORICO, fim: str = FIM_HISTORICO, seed: int = 0) -> pd.DataFrame:
+    """
+    Synthetic daily CDI (SGS 11 format: % per business day), following a policy
+    rate that moves in 0.25/0.50 p.p. steps about every 30 business days
+    between 2% and 14.25% a year.
+    """
+    rng = np.random.default_rng(seed)
+    dias = np.arange(np.datetime64(inicio, 'D'), np.datetime64(fim, 'D') + 1)
+    dias = dias[np.is_busday(dias, busdaycal=calendario_br())]
+
+    passos = np.where(rng.random(len(dias)) < 1 / 30, rng.choice([-0.5, -0.25, 0.25, 0.5], len(dias)), 0.0)
+    anual = np.empty(len(dias))
+    nivel = 13.75
+    for i, passo in enumerate(passos):
+        nivel = min(max(nivel + passo, 2.0), 14.25)
+        anual[i] = nivel
+    diaria = ((1 + (anual - 0.10) / 100) ** (1 / 252) - 1) * 100
+
+    return pd.DataFrame({'CDI': diaria.round(6)}, index=pd.DatetimeIndex(dias, name='Date'))
+
+
+def gerar_historico_ipca(inicio: str = INICIO_HISTORICO, fim: str = FIM_HISTORICO, seed: int = 0) -> pd.DataFrame:
+    """Synthetic monthly IPCA (SGS 433 format: % in the month, indexed by the first day of the month)."""
+    rng = np.random.default_rng(seed + 1)
+    # o IPCA de um mês só é publicado no mês seguinte
+    meses = pd.date_range(inicio, pd.Timestamp(fim) - pd.offsets.MonthBegin(1), freq='MS')
+    return pd.DataFrame({'IPCA+taxa': rng.normal(0.40, 0.30, len(meses)).round(2)},
+                        index=pd.DatetimeIndex(meses, name='Date'))
+
+
+def carregar_fixtures() -> tuple:
+    """
+    Frozen CDI and IPCA histories (fixtures/hist_cdi.csv and hist_ipca.csv), used
+    by the benchmarks in place of the SGS download.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: hist_cdi and hist_ipca, indexed by 'Date'.
+    """
+    historicos = []
+    for nome in ('hist_cdi', 'hist_ipca'):
+        historicos.append(pd.read_csv(os.path.join(path_folder_fixtures, f'{nome}.csv'), sep=';',
+                                      index_col='Date', parse_dates=['Date']))
+    return tuple(historicos)
+
+
+def gravar_fixtures(seed: int = 0):
+    """Regenerates the frozen fixtures (only when the generator changes on purpose)."""
+    os.makedirs(path_folder_fixtures, exist_ok=True)
+    gerar_historico_cdi(seed=seed).to_csv(os.path.join(path_folder_fixtures, 'hist_cdi.csv'), sep=';')
+    gerar_historico_ipca(seed=seed).to_csv(os.path.join(path_folder_fixtures, 'hist_ipca.csv'), sep=';')
+
+
+if __name__ == "__main__":
+    gravar_fixtures()
@@ -0,0 +1,145 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from gerador import DATA_REFERENCIA, carregar_fixtures, gerar_carteira
+
+from financeiro.agregacao import agregar
+from financeiro.calculos import (calc_cumulative_rate_cdi, calc_cumulative_rate_ipca, calc_cumulative_rate_pre,
+                                 calcular_valor_liquido, parse_date)
+from financeiro.calendario import feriados_nacionais
+from financeiro.datas import parse_date_column
+from financeiro.indices import CDIIndex, IPCAIndex
+from financeiro.transform import filtrar_ativos, transform
+from financeiro.valuation import calc_cumulative_rate_bulk, calc_valor_liquido_bulk
+
+# Benchmarks das etapas do pipeline sobre carteiras sintéticas e históricos congelados.
+#   python benchmarks/run.py --tamanhos 1000 10000 100000 1000000
+# Resultado em JSON (benchmarks/resultados/<data>.json) para acompanhar regressões.
+
+path_folder_resultados=os.path.join(os.path.dirname(os.path.realpath(__file__)),'resultados')
+
+
+def medir(funcao, repeticoes: int = 3) -> dict:
+    """
+    Runs funcao() repeticoes times for the best wall time, then once more under
+    tracemalloc for the peak of memory allocated during the call.
+
+    Returns:
+        dict: segundos (best time) and pico_memoria_mb.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'segundos': min(tempos), 'pico_memoria_mb': pico / 2**20}
+
+
+def etapas(carteira: pd.DataFrame, hist_cdi: pd.DataFrame, hist_ipca: pd.DataFrame, amostra: int) -> dict:
+    """
+    Stages measured for a ledger: {etapa: (linhas, funcao)}. The row-by-row
+    functions of financeiro.calculos run on the first `amostra` rows only, so
+    large sizes stay feasible; throughput is comparable anyway.
+    """
+    data_fim = DATA_REFERENCIA
+    indice_cdi, indice_ipca = CDIIndex(hist_cdi), IPCAIndex(hist_ipca)
+    df = transform(carteira, data_fim)
+    ativo = filtrar_ativos(df)
+    bruto = calc_cumulative_rate_bulk(ativo, data_fim, indice_ipca, indice_cdi) * ativo['APORTE']
+    valorado = ativo.assign(VALOR_ATUAL_BRUTO=bruto, VALOR_ATUAL_LIQUIDO=bruto)
+    dias = (pd.Timestamp(data_fim) - pd.to_datetime(ativo['DATA_INICIO'])).dt.days.to_numpy()
+
+    # as funções linha a linha recebem as datas como texto YYYY-MM-DD
+    texto = valorado.assign(DATA_INICIO=valorado['DATA_INICIO'].dt.strftime('%Y-%m-%d'))
+    linha = {tipo: texto[texto['TIPO_RENDIMENTO'] == tipo].head(amostra) for tipo in ('CDI', 'IPCA+taxa', 'Pré')}
+    feriados = feriados_nacionais()
+    datas_texto = carteira['DATA_INICIO'].head(amostra)
+
+    def por_linha(parte, funcao):
+        # as funções linha a linha imprimem avisos; a saída é descartada
+        def executar():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return [funcao(r) for r in parte.itertuples(index=False)]
+        return executar
+
+    return {
+        'parse_date': (len(datas_texto), lambda: datas_texto.map(parse_date)),
+        'parse_date_column': (len(carteira), lambda: parse_date_column(carteira['DATA_INICIO'])),
+        'transform': (len(carteira), lambda: transform(carteira, data_fim)),
+        'calc_cumulative_rate_cdi': (len(linha['CDI']), por_linha(linha['CDI'], lambda r: calc_cumulative_rate_cdi(
+            r.DATA_INICIO, data_fim, r.TAXA_AA, hist_cdi))),
+        'calc_cumulative_rate_ipca': (len(linha['IPCA+taxa']), por_linha(linha['IPCA+taxa'], lambda r: calc_cumulative_rate_ipca(
+            r.DATA_INICIO, data_fim, r.TAXA_AA, hist_ipca))),
+        'calc_cumulative_rate_pre': (len(linha['Pré']), por_linha(linha['Pré'], lambda r: calc_cumulative_rate_pre(
+            r.DATA_INICIO, data_fim, r.TAXA_AA, feriados))),
+        'calc_cumulative_rate_bulk': (len(ativo), lambda: calc_cumulative_rate_bulk(ativo, data_fim, indice_ipca, indice_cdi)),
+        'calcular_valor_liquido': (min(amostra, len(texto)), lambda: texto.head(amostra).apply(
+            calcular_valor_liquido, axis=1, args=(data_fim,))),
+        'calc_valor_liquido_bulk': (len(ativo), lambda: calc_valor_liquido_bulk(
+            ativo['TIPO_PAPEL'].to_numpy(), ativo['APORTE'].to_numpy(), bruto.to_numpy(), dias)),
+        'agregar': (len(valorado), lambda: agregar(valorado)),
+    }
+
+
+def metadados(seed: int) -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.realpath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'data': pd.Timestamp.now().isoformat(timespec='seconds'), 'commit': commit, 'seed': seed,
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'plataforma': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks das etapas do pipeline.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help="números de posições das carteiras sintéticas (default: %(default)s)")
+    parser.add_argument('--etapas', nargs='+', default=None, help="só estas etapas (default: todas)")
+    parser.add_argument('--amostra', type=int, default=2_000,
+                        help="linhas usadas pelas funções linha a linha (default: %(default)s)")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--saida', default=None, help="arquivo JSON (default: resultados/<data>.json)")
+    args = parser.parse_args(argv)
+
+    hist_cdi, hist_ipca = carregar_fixtures()
+    resultados = []
+    for tamanho in args.tamanhos:
+        carteira = gerar_carteira(tamanho, seed=args.seed)
+        for etapa, (linhas, funcao) in etapas(carteira, hist_cdi, hist_ipca, args.amostra).items():
+            if args.etapas and etapa not in args.etapas:
+                continue
+            medida = medir(funcao, args.repeticoes)
+            resultados.append({'etapa': etapa, 'tamanho': tamanho, 'linhas': linhas, **medida,
+                               'linhas_por_segundo': linhas / medida['segundos'] if medida['segundos'] else None})
+            print(f"{etapa:28s} {tamanho:>9d} {linhas:>9d} linhas {medida['segundos']:9.4f}s "
+                  f"{resultados[-1]['linhas_por_segundo'] or 0:>14,.0f} linhas/s {medida['pico_memoria_mb']:9.1f} MB")
+
+    saida = args.saida or os.path.join(path_folder_resultados, f"{pd.Timestamp.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump({'metadados': metadados(args.seed), 'resultados': resultados}, arquivo, indent=2, ensure_ascii=False)
+    print("Resultados em", saida)
+
+
+if __name__ == "__main__":
+    main()
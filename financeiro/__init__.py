@@ -0,0 +1,6 @@
+"""
+Funções de cálculo do dash-financeiro.
+
+Os módulos são importados diretamente (ex.: ``from financeiro.valuation import ...``)
+para que importar o pacote continue leve.
+"""
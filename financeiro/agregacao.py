@@ -0,0 +1,213 @@
+import pandas as pd
+
+
+#   Granularidade do cubo: todas as dimensões dos relatórios mais a própria taxa,
+#   para que média, média ponderada, mediana, mínimo e máximo saiam do cubo
+DIMENSOES = ['EMISSOR', 'TIPO_PAPEL', 'TIPO_RENDIMENTO', 'OBJETIVO', 'ANO_RESGATE', 'MES_RESGATE']
+CHAVES = DIMENSOES + ['TAXA_AA']
+MEDIDAS = ['APORTE', 'VALOR_ATUAL_BRUTO', 'VALOR_ATUAL_LIQUIDO']
+
+#   Dimensões filtráveis no dashboard: uma linha do cubo de filtros por combinação
+FILTROS = ['EMISSOR', 'TIPO_PAPEL', 'TIPO_RENDIMENTO', 'OBJETIVO']
+
+#   Resolução do histograma de taxas do cubo de filtros: pontos-base por unidade de TAXA_AA
+#   (0.0678 -> 678); a mediana filtrada é exata até 1 ponto-base
+PONTOS_BASE = 10_000
+
+
+def parcial(ativo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Single pass over the positions: count and sums of MEDIDAS for each combination
+    of CHAVES. Every report table is a roll-up of this frame, and frames of
+    different chunks of data can be combined with juntar().
+
+    Args:
+        ativo (pd.DataFrame): Active positions with CHAVES and MEDIDAS.
+
+    Returns:
+        pd.DataFrame: One row per combination of CHAVES (missing keys kept), with N and MEDIDAS.
+    """
+    medidas = [m for m in MEDIDAS if m in ativo.columns]
+    grupos = ativo.groupby(CHAVES, observed=True, dropna=False, sort=False)
+    return grupos[medidas].sum().assign(N=grupos.size()).reset_index()
+
+
+def juntar(parciais: list) -> pd.DataFrame:
+    """Combines partial frames (e.g. of chunks of the ledger) into one."""
+    parciais = [p for p in parciais if not p.empty]
+    if not parciais:
+        return pd.DataFrame(columns=CHAVES + MEDIDAS + ['N'])
+    medidas = [c for c in parciais[0].columns if c not in CHAVES]
+    return (pd.concat(parciais, ignore_index=True)
+            .groupby(CHAVES, observed=True, dropna=False, sort=False)[medidas].sum()
+            .reset_index())
+
+
+def _mediana(cubo: pd.DataFrame, dimensao: str, taxa: str = 'TAXA_AA') -> pd.Series:
+    """Median of the taxa column per group, from the count of positions of each rate."""
+    contagem = (cubo.groupby([dimensao, taxa], observed=True)['N'].sum()
+                .reset_index().sort_values([dimensao, taxa]))
+    acumulado = contagem.groupby(dimensao, observed=True)['N'].cumsum()
+    total = contagem.groupby(dimensao, observed=True)['N'].transform('sum')
+    anterior = acumulado - contagem['N']
+
+    valores = []
+    for posicao in [(total - 1) // 2, total // 2]:
+        linha = (anterior <= posicao) & (acumulado > posicao)
+        valores.append(contagem[linha].set_index(dimensao)[taxa])
+    return (valores[0] + valores[1]) / 2
+
+
+def estatisticas_taxa(cubo: pd.DataFrame, dimensao: str) -> pd.DataFrame:
+    """
+    Mean, APORTE-weighted mean, median, min and max of TAXA_AA per group,
+    computed from the cube (no per-group Python callbacks).
+
+    Args:
+        cubo (pd.DataFrame): Output of parcial()/juntar().
+        dimensao (str): Grouping column.
+
+    Returns:
+        pd.DataFrame: Indexed by dimensao, columns Media_A, Media_Ponderada, Mediana, Min, Max.
+    """
+    cubo = cubo[cubo['TAXA_AA'].notna()]
+    somas = (cubo.assign(TAXA_X_N=cubo['TAXA_AA'] * cubo['N'],
+                         TAXA_X_APORTE=cubo['TAXA_AA'] * cubo['APORTE'])
+             .groupby(dimensao, observed=True)
+             .agg(N=('N', 'sum'), APORTE=('APORTE', 'sum'), TAXA_X_N=('TAXA_X_N', 'sum'),
+                  TAXA_X_APORTE=('TAXA_X_APORTE', 'sum'), Min=('TAXA_AA', 'min'), Max=('TAXA_AA', 'max')))
+    return pd.DataFrame({'Media_A': somas['TAXA_X_N'] / somas['N'],
+                         'Media_Ponderada': somas['TAXA_X_APORTE'] / somas['APORTE'],
+                         'Mediana': _mediana(cubo, dimensao),
+                         'Min': somas['Min'],
+                         'Max': somas['Max']})
+
+
+def cubo_filtros(cubo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Roll-up of the cube to FILTROS: N, the sums of MEDIDAS, the sums of TAXA_AA
+    weighted by N and by APORTE and the min and max TAXA_AA, enough for every
+    dashboard aggregate under any filter except the median (see histograma_taxas
+    and fatiar). Its size depends on the number of combinations of FILTROS, not on
+    the number of positions or of distinct rates.
+
+    Args:
+        cubo (pd.DataFrame): Output of parcial()/juntar().
+
+    Returns:
+        pd.DataFrame: One row per combination of FILTROS.
+    """
+    medidas = [c for c in MEDIDAS + ['N'] if c in cubo.columns]
+    return (cubo.assign(TAXA_X_N=cubo['TAXA_AA'] * cubo['N'], TAXA_X_APORTE=cubo['TAXA_AA'] * cubo['APORTE'])
+            .groupby(FILTROS, observed=True, dropna=False, sort=False)
+            .agg(**{m: (m, 'sum') for m in medidas + ['TAXA_X_N', 'TAXA_X_APORTE']},
+                 TAXA_MIN=('TAXA_AA', 'min'), TAXA_MAX=('TAXA_AA', 'max'))
+            .reset_index())
+
+
+def histograma_taxas(cubo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Number of positions per combination of FILTROS and TAXA_AA in basis points
+    (TAXA_PB, see PONTOS_BASE), for the median of TAXA_AA under a filter. Its size
+    is bounded by the combinations of FILTROS times the rates at that resolution.
+
+    Args:
+        cubo (pd.DataFrame): Output of parcial()/juntar().
+
+    Returns:
+        pd.DataFrame: FILTROS, TAXA_PB and N.
+    """
+    cubo = cubo[cubo['TAXA_AA'].notna()]
+    return (cubo.assign(TAXA_PB=(cubo['TAXA_AA'] * PONTOS_BASE).round().astype('int64'))
+            .groupby(FILTROS + ['TAXA_PB'], observed=True, dropna=False, sort=False)['N']
+            .sum().reset_index())
+
+
+def _selecionar(df: pd.DataFrame, selecao: dict) -> pd.DataFrame:
+    mascara = pd.Series(True, index=df.index)
+    for coluna, valores in selecao.items():
+        mascara &= df[coluna].isin(list(valores))
+    return df[mascara]
+
+
+def fatiar(cubo: pd.DataFrame, selecao: dict, taxas: pd.DataFrame = None) -> dict:
+    """
+    Dashboard aggregates for a filter selection, rolled up from the filter cube.
+    The rate statistics are exact except the median, which comes from the rate
+    histogram and is exact to one basis point.
+
+    Args:
+        cubo (pd.DataFrame): Output of cubo_filtros().
+        selecao (dict): Selected values per FILTROS column, e.g. {'EMISSOR': [...],
+            'TIPO_PAPEL': [...]}; missing columns are not filtered.
+        taxas (pd.DataFrame): Output of histograma_taxas() (default: Mediana left empty).
+
+    Returns:
+        dict: 'df_total2' (sums of MEDIDAS), 'df_dist_objetivo' (VALOR_ATUAL_BRUTO per
+        OBJETIVO), 'df_taxa_media2' (Media_A, Media_P, Mediana, Min, Max per
+        TIPO_RENDIMENTO), 'por_tipo_rendimento' and 'por_emissor' (APORTE per group).
+    """
+    cubo = _selecionar(cubo, selecao)
+
+    somas = cubo.groupby('TIPO_RENDIMENTO', observed=True).agg(
+        N=('N', 'sum'), APORTE=('APORTE', 'sum'), TAXA_X_N=('TAXA_X_N', 'sum'),
+        TAXA_X_APORTE=('TAXA_X_APORTE', 'sum'), Min=('TAXA_MIN', 'min'), Max=('TAXA_MAX', 'max'))
+    if taxas is not None:
+        mediana = _mediana(_selecionar(taxas, selecao), 'TIPO_RENDIMENTO', 'TAXA_PB') / PONTOS_BASE
+    else:
+        mediana = pd.Series(float('nan'), index=somas.index)
+    taxa_media = pd.DataFrame({'Media_A': somas['TAXA_X_N'] / somas['N'],
+                               'Media_P': somas['TAXA_X_APORTE'] / somas['APORTE'],
+                               'Mediana': mediana,
+                               'Min': somas['Min'],
+                               'Max': somas['Max']})
+    return {
+        'df_total2': cubo[MEDIDAS].sum(),
+        'df_dist_objetivo': cubo.groupby('OBJETIVO', observed=True)['VALOR_ATUAL_BRUTO'].sum().reset_index(),
+        'df_taxa_media2': taxa_media,
+        'por_tipo_rendimento': cubo.groupby('TIPO_RENDIMENTO', observed=True)['APORTE'].sum(),
+        'por_emissor': cubo.groupby('EMISSOR', observed=True)['APORTE'].sum(),
+    }
+
+
+def finalizar(cubo: pd.DataFrame) -> dict:
+    """
+    Builds every summary table main.py writes from the cube.
+
+    Args:
+        cubo (pd.DataFrame): Output of parcial()/juntar().
+
+    Returns:
+        dict: df_total, por_emissor, df_dist_tipo_taxa, df_dist_tipo_papel, por_objetivo,
+        df_resgate_anomes (pivot MES_RESGATE x ANO_RESGATE), df_taxa_media, df_taxa_media2
+        df_cubo (cubo_filtros) and df_cubo_taxas (histograma_taxas), for the dashboard filters.
+    """
+    df_total = cubo[MEDIDAS].sum().reset_index()
+    df_total.columns = ['TIPO_ACUMULADO', 'VALOR']
+
+    def somar(dimensao, medida):
+        return cubo.groupby(dimensao, observed=True)[medida].sum()
+
+    df_resgate_anomes = cubo.pivot_table(index=['MES_RESGATE'], columns='ANO_RESGATE',
+                                         values='APORTE', aggfunc='sum', observed=True)
+    df_resgate_anomes.reset_index(inplace=True)
+
+    df_taxa_media2 = estatisticas_taxa(cubo, 'TIPO_RENDIMENTO')
+
+    return {
+        'df_total': df_total,
+        'por_emissor': somar('EMISSOR', 'APORTE'),
+        'df_dist_tipo_taxa': somar('TIPO_RENDIMENTO', 'VALOR_ATUAL_LIQUIDO').reset_index(),
+        'df_dist_tipo_papel': somar('TIPO_PAPEL', 'VALOR_ATUAL_LIQUIDO').reset_index(),
+        'por_objetivo': somar('OBJETIVO', 'APORTE'),
+        'df_resgate_anomes': df_resgate_anomes,
+        'df_taxa_media': df_taxa_media2[['Media_A']].rename(columns={'Media_A': 'TAXA_AA'}).reset_index(),
+        'df_taxa_media2': df_taxa_media2,
+        'df_cubo': cubo_filtros(cubo),
+        'df_cubo_taxas': histograma_taxas(cubo),
+    }
+
+
+def agregar(ativo: pd.DataFrame) -> dict:
+    """Every summary table of main.py in one aggregation stage (see finalizar)."""
+    return finalizar(parcial(ativo))
@@ -0,0 +1,276 @@
+import logging
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+
+# Funções de cálculo linha a linha (antes em main.py). A valoração em lote fica em
+# financeiro.valuation; estas continuam como referência e para uso pontual.
+
+logger = logging.getLogger(__name__)
+
+
+def parse_date(date_str):
+    try:
+        # Attempt to parse date using known formats. Iterative process
+        date_formats = ['%d-%b-%y',
+                        '%y-%b-%d',
+                        '%d-%b-%Y',
+                        '%Y-%b-%d',
+                        '%m-%d-%Y %H:%M:%S',
+                        '%d-%m-%Y %H:%M:%S',
+                        '%d-%m-%Y %H:%M',
+                        '%d-%m-%y %H:%M:%S',
+                        '%d-%m-%y %H:%M',
+                        '%Y-%m-%d %H:%M:%S',
+                        '%Y-%m-%d %H:%M',
+                        '%d-%m-%Y',
+                        '%m-%d-%Y %H:%M',
+                        '%m/%d/%Y %H:%M:%S',
+                        '%d/%m/%Y %H:%M:%S',
+                        '%m/%d/%Y %H:%M:%S',
+                        '%d/%m/%Y %H:%M',                        
+                        '%d/%m/%Y',
+                        '%m/%d/%Y %H:%M'
+                  ]
+        for fmt in date_formats:
+            try:
+                return datetime.strptime(date_str, fmt)
+            except ValueError:
+                pass
+        # If none of the known formats match, return None
+        return None
+    except Exception as e:
+        logger.warning(f"Error parsing date: {e}")
+        return None
+def get_taxa_time_series_bcb(start_date:str,dict_nome_taxa:dict):
+    """
+    Retrieves a time series for the specified 'dict_nome_taxa' from SGS (Time Series Management System)
+    of the Brazilian Central Bank, transforms it into a DataFrame.
+
+    Args:
+        start_date (str): Start date in YYYY-MM-DD format.
+        dict_nome_taxa (str): Name of the economic indicator
+
+    Returns:
+        pandas.DataFrame: A DataFrame containing data requestedd.
+
+    Raises:
+        ValueError: If the retrieved data is empty or there's an error during data retrieval.
+    """
+
+    # bcb só é importado quando há download
+    from bcb import sgs
+
+    try:
+        # Fetch time series data using SGS
+        data = sgs.get(dict_nome_taxa,
+            start=start_date     
+        )
+        return data
+
+    except Exception as e:
+        raise ValueError(f"Error retrieving data: {e}")
+
+def calc_cumulative_rate_cdi(data_inicio: str, data_fim: str, correcao_valor: float, df_historico: pd.DataFrame) -> float:
+    """
+    Processes a historical DataFrame containing economic indicators
+    (SELIC and IPCA) to calculate the cumulative product for a specific period
+    and taxa (column name).
+
+    Args:
+    data_inicio (str): Start date in YYYY-MM-DD format.
+    data_fim (str): End date in YYYY-MM-DD format.
+    correcao_valor (float): Correction value to be applied in the cumulative calculation.
+    df_historico (pd.DataFrame): DataFrame with historical data indexed by dates.
+
+    Returns:
+    float: The penultimate value from the 'cumulativo' column.
+
+    Raises:
+    ValueError: If the selected data is empty or there's an error during processing.
+    """
+    
+    # Select data within the specified date range
+    df_taxa = df_historico.loc[data_inicio:data_fim].reset_index()
+    
+    # Check if any data is selected
+    if df_taxa.empty:
+        raise ValueError(f"No data found for between {data_inicio} and {data_fim}")
+
+    # Add cumulative product column
+    df_taxa['cumulativo'] = (1 + correcao_valor * df_taxa['CDI'] / 100).cumprod()
+
+    # Check if the DataFrame has at least two rows to return the penultimate value
+    if len(df_taxa['cumulativo']) < 2:
+        return 1
+    
+        
+    # Return the penultimate value from 'cumulativo'
+    return df_taxa['cumulativo'].iloc[-2]
+
+def calc_cumulative_rate_ipca(data_inicio:str,data_fim: str, correcao_valor:float,df_historico:pd.DataFrame) -> float:
+  """
+  Calculates the cumulative rate based on historical data and correction factors.
+
+  Args:
+      data_inicio (str): Start date in YYYY-MM-DD format.
+      data_fim (str): End date in YYYY-MM-DD format.
+      correcao_tipo (str): Type of correction (e.g., 'IPCA').
+      correcao_valor (float): Correction value (e.g., annual inflation rate).
+      df_historico (pd.DataFrame): Historical data DataFrame containing an 'ipca' column.
+
+  Returns:
+      float: The last value of the 'ipca_acumulado' column, representing the cumulative rate.
+  """
+
+  # Filter data within the specified date range
+  # Select data within the specified date range
+  #df = df_historico.loc[data_inicio:data_fim].reset_index()
+  df = df_historico.loc[data_inicio::].reset_index()  
+
+    # Check if any data is selected
+  if df.empty:
+    logger.debug(f"No data found for between {data_inicio} and {data_fim}")
+    return 1
+    raise ValueError(f"No data found for between {data_inicio} and {data_fim}")
+
+    # Add cumulative product column
+  df['cumulativo'] = (1 + correcao_valor * df['IPCA+taxa'] / 100).cumprod()
+
+    # Check if the DataFrame has at least two rows to return the penultimate value
+  if len(df['cumulativo']) < 2:
+        return 1
+
+  # Calculate month difference (assuming 'DATA' column stores dates)
+  try:
+
+    n_months = len(df)-2
+  except Exception as e:
+    raise ValueError("Dataframe 'df_historico' does not contain a 'DATA' column for date calculations.")
+
+  # Calculate monthly adjustment factor (considering potential errors)
+  try:
+    taxa_fixa_periodo = (1 + correcao_valor) ** (n_months / 12) - 1
+  except ZeroDivisionError:
+    raise ValueError("Correction value cannot be zero.")
+
+  # Add 'ipca_corrigido' column with error handling0
+  try:
+    df['ipca_corrigido'] = df['IPCA+taxa'] / 100 
+  except Exception as e:
+     logger.error("Erro na criacao de ipca_corrigido %s",e)
+
+  # Add 'ipca_acumulado' column for cumulative rate
+  df['ipca_acumulado'] = (1 + df['ipca_corrigido']).cumprod()
+
+  # Corrigir com taxa fixa
+  df['ipca_acumulado']= (1+df['ipca_acumulado'])*(1+taxa_fixa_periodo)-1
+
+
+  # Return the last value of 'ipca_acumulado' (cumulative rate)
+  return df['ipca_acumulado'].iloc[-2]
+def calc_cumulative_rate_pre(data_inicio:str, data_fim:str, taxa_ano:float, feriados:list):
+  """
+  This function calculates the accumulated interest rate for a bond with a fixed rate.
+
+  Args:
+      data_inicio (str): Date of the beginning of the period in format YYYY-MM-DD.
+      data_fim (str): Date of the end of the period in format YYYY-MM-DD.
+      feriados (list): List of holidays as dates in format YYYY-MM-DD.
+      taxa_ano (float): Interest rate for the year.
+
+  Returns:
+      float: Accumulated interest rate for the period.
+  """
+  total_days1 = np.busday_count(data_inicio, data_fim,holidays=feriados)
+  total_days = np.busday_count(data_inicio, data_fim)
+  # Convert dates to datetime format
+  data_inicio = pd.to_datetime(data_inicio)
+  data_fim = pd.to_datetime(data_fim)
+
+
+  # Convert holidays list to datetime format
+  feriados_dt = pd.to_datetime(feriados)
+
+  # Filter holidays within the period
+  feriados_no_periodo = feriados_dt[(feriados_dt >= data_inicio) & (feriados_dt <= data_fim)]
+
+  # Count number of holidays within the period
+  num_feriados = feriados_no_periodo.shape[0]
+  
+  # Subtract holidays from total days
+  dias_corridos = total_days-num_feriados+1 #- num_feriados-1
+
+  dias_corridos=total_days1  
+  #print("total de dias",total_days)
+  #print("total de dias",total_days)
+
+  #print('corridos',dias_corridos)
+  #print('feriados',num_feriados)
+
+  # Calculate daily interest rate
+  juros_acumulados = (taxa_ano+1)**(dias_corridos/252)-1
+
+  return 1+juros_acumulados
+def calc_cumulative_rate_general(row,data_fim,df_hist_ipca,df_hist_selic,feriados)->float:
+   
+   taxa_tipo=row['TIPO_RENDIMENTO']
+   taxa_ano=row['TAXA_AA']
+   data_inicio=row['DATA_INICIO'] 
+
+   logger.debug("%s %s %s",taxa_tipo,taxa_ano,data_inicio)
+   
+   if taxa_tipo == 'CDI':
+        return calc_cumulative_rate_cdi(data_inicio,data_fim,taxa_ano,df_hist_selic)
+   elif taxa_tipo == 'IPCA+taxa':
+        return calc_cumulative_rate_ipca(data_inicio,data_fim,taxa_ano,df_hist_ipca)
+   elif taxa_tipo=='Pré':
+        return calc_cumulative_rate_pre(data_inicio,data_fim,taxa_ano,feriados)
+   else:
+       return 0
+
+def calcular_valor_liquido(row, data_atual):
+    """
+    Calcula o valor acumulado líquido considerando as regras de imposto regressivo da renda fixa do Brasil.
+    
+    Args:
+    data_inicio (str): Data de início do investimento no formato 'YYYY-MM-DD'.
+    data_atual (str): Data atual ou data de resgate no formato 'YYYY-MM-DD'.
+    tipo_papel (str): Tipo do papel. Se for 'CDB', a regra de imposto será aplicada.
+    valor_aporte (float): Valor inicial do aporte.
+    valor_bruto (float): Valor bruto acumulado.
+    
+    Returns:
+    float: Valor líquido acumulado após aplicação do imposto (se aplicável).
+    """
+    
+    if row['TIPO_PAPEL'] != 'CDB':
+        return row['VALOR_ATUAL_BRUTO']
+    
+   
+    # Converter as datas para objetos datetime
+    data_inicio = datetime.strptime(row['DATA_INICIO'], '%Y-%m-%d')
+    data_atual = datetime.strptime(data_atual, '%Y-%m-%d')
+    
+    # Calcular o número de dias entre as duas datas
+    dias = (data_atual - data_inicio).days
+    
+    # Determinar a alíquota de imposto com base no número de dias
+    if dias <= 180:
+        aliquota = 0.225
+    elif dias <= 360:
+        aliquota = 0.20
+    elif dias <= 720:
+        aliquota = 0.175
+    else:
+        aliquota = 0.15
+    
+    # Calcular o imposto devido
+    rendimento_bruto = row['VALOR_ATUAL_BRUTO'] - row['APORTE']
+    imposto = rendimento_bruto * aliquota
+    
+    # Calcular o valor líquido
+    valor_liquido =  row['VALOR_ATUAL_BRUTO'] - imposto
+    
+    return valor_liquido
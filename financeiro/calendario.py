@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+#   Anos cobertos pelo calendário padrão
+ANO_INICIO = 1990
+ANO_FIM = 2100
+
+#   (mês, dia) dos feriados nacionais de data fixa
+FERIADOS_FIXOS = [
+    (1, 1),     # Confraternização Universal
+    (4, 21),    # Tiradentes
+    (5, 1),     # Dia do Trabalho
+    (9, 7),     # Independência
+    (10, 12),   # Nossa Senhora Aparecida
+    (11, 2),    # Finados
+    (11, 15),   # Proclamação da República
+    (12, 25),   # Natal
+]
+
+#   Consciência Negra é feriado nacional a partir de 2024 (Lei 14.759/2023)
+ANO_CONSCIENCIA_NEGRA = 2024
+
+#   Dias em relação ao domingo de Páscoa
+FERIADOS_MOVEIS = [
+    -48,    # Segunda de Carnaval
+    -47,    # Terça de Carnaval
+    -2,     # Sexta-feira Santa
+    60,     # Corpus Christi
+]
+
+
+def to_days(values) -> np.ndarray:
+    """
+    Converts dates (strings YYYY-MM-DD, datetime or Timestamp) to datetime64[D].
+    datetime64 arrays keep their shape, so they can be broadcast.
+    """
+    if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[D]')
+    return pd.to_datetime(pd.Series(np.atleast_1d(values))).to_numpy().astype('datetime64[D]')
+
+
+def pascoa(ano: int) -> date:
+    """
+    Easter Sunday of the given year (anonymous Gregorian algorithm).
+
+    Args:
+        ano (int): Year.
+
+    Returns:
+        date: Easter Sunday.
+    """
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def feriados_nacionais(ano_inicio: int = ANO_INICIO, ano_fim: int = ANO_FIM) -> np.ndarray:
+    """
+    Brazilian national holidays (fixed dates plus Carnaval, Good Friday and
+    Corpus Christi) between ano_inicio and ano_fim, inclusive.
+
+    Args:
+        ano_inicio (int): First year.
+        ano_fim (int): Last year.
+
+    Returns:
+        np.ndarray: Sorted holidays as datetime64[D].
+    """
+    feriados = []
+    for ano in range(ano_inicio, ano_fim + 1):
+        feriados += [date(ano, mes, dia) for mes, dia in FERIADOS_FIXOS]
+        if ano >= ANO_CONSCIENCIA_NEGRA:
+            feriados.append(date(ano, 11, 20))
+        domingo_pascoa = pascoa(ano)
+        feriados += [domingo_pascoa + timedelta(days=n) for n in FERIADOS_MOVEIS]
+    return np.unique(np.array(feriados, dtype='datetime64[D]'))
+
+
+@lru_cache(maxsize=None)
+def calendario_br(ano_inicio: int = ANO_INICIO, ano_fim: int = ANO_FIM) -> np.busdaycalendar:
+    """Business-day calendar (Mon-Fri minus national holidays), built once per year range."""
+    return np.busdaycalendar(holidays=feriados_nacionais(ano_inicio, ano_fim))
+
+
+def dias_uteis(data_inicio, data_fim) -> np.ndarray:
+    """
+    Business days in [data_inicio, data_fim), like np.busday_count.
+
+    Args:
+        data_inicio: Start date(s) (YYYY-MM-DD, datetime or datetime64 array).
+        data_fim: End date(s), scalar or aligned with data_inicio.
+
+    Returns:
+        np.ndarray: Number of business days of each period.
+    """
+    return np.busday_count(to_days(data_inicio), to_days(data_fim), busdaycal=calendario_br())
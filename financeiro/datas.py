@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+
+#   Formatos de parse_date, na mesma ordem de prioridade, mais o ISO '%Y-%m-%d'
+#   (que parse_date não reconhecia e deixava passar sem conversão)
+DATE_FORMATS = ['%d-%b-%y',
+                '%y-%b-%d',
+                '%d-%b-%Y',
+                '%Y-%b-%d',
+                '%m-%d-%Y %H:%M:%S',
+                '%d-%m-%Y %H:%M:%S',
+                '%d-%m-%Y %H:%M',
+                '%d-%m-%y %H:%M:%S',
+                '%d-%m-%y %H:%M',
+                '%Y-%m-%d %H:%M:%S',
+                '%Y-%m-%d %H:%M',
+                '%d-%m-%Y',
+                '%m-%d-%Y %H:%M',
+                '%m/%d/%Y %H:%M:%S',
+                '%d/%m/%Y %H:%M:%S',
+                '%d/%m/%Y %H:%M',
+                '%d/%m/%Y',
+                '%m/%d/%Y %H:%M',
+                '%Y-%m-%d',
+                ]
+
+
+def _parse_format(valores: np.ndarray, fmt: str) -> np.ndarray:
+    """Parses all values with a single format; values that don't match become NaT."""
+    return pd.to_datetime(pd.Series(valores, dtype=object), format=fmt, errors='coerce').to_numpy()
+
+
+def infer_date_formats(valores: np.ndarray, date_formats: list = DATE_FORMATS, tamanho_amostra: int = 100) -> list:
+    """
+    Orders date_formats by how many values of a sample of the column each one parses.
+    Formats that parse nothing in the sample go last; ties keep the original priority.
+
+    Args:
+        valores (np.ndarray): Distinct values of the column.
+        date_formats (list): Candidate formats, in priority order.
+        tamanho_amostra (int): Maximum number of values tested.
+
+    Returns:
+        list: date_formats reordered, most likely first.
+    """
+    passo = max(1, len(valores) // tamanho_amostra)
+    amostra = valores[::passo][:tamanho_amostra]
+    acertos = [np.count_nonzero(~np.isnat(_parse_format(amostra, fmt))) for fmt in date_formats]
+    ordem = sorted(range(len(date_formats)), key=lambda i: -acertos[i])
+    return [date_formats[i] for i in ordem]
+
+
+def _distintos(coluna: pd.Series, ignorar: tuple = ()) -> tuple:
+    """Codes of the rows, the distinct values as stripped strings and the mask of the sentinels among them."""
+    codigos, unicos = pd.factorize(coluna.astype(object))
+    textos = np.array([str(v).strip() for v in np.asarray(unicos, dtype=object)], dtype=object)
+    return codigos, textos, np.isin(textos, list(ignorar))
+
+
+def formatos_coluna(coluna: pd.Series, date_formats: list = DATE_FORMATS, ignorar: tuple = (),
+                    tamanho_amostra: int = 100) -> list:
+    """
+    Order in which parse_date_column tries date_formats on coluna (infer_date_formats
+    on its distinct values). Inferred once, e.g. from the first chunk of a ledger, and
+    passed with inferir=False, it makes every chunk parse the same way.
+
+    Args:
+        coluna (pd.Series): Column with dates as strings.
+        date_formats (list): Candidate formats, in priority order.
+        ignorar (tuple): Sentinel values that are not dates (e.g. 'Resgatado').
+        tamanho_amostra (int): Number of distinct values used to infer the format.
+
+    Returns:
+        list: date_formats reordered, most likely first.
+    """
+    _, textos, sentinela = _distintos(coluna, ignorar)
+    return infer_date_formats(textos[~sentinela], date_formats, tamanho_amostra)
+
+
+def parse_date_column(coluna: pd.Series, date_formats: list = DATE_FORMATS, ignorar: tuple = (),
+                      tamanho_amostra: int = 100, inferir: bool = True, obrigatoria: bool = False):
+    """
+    Parses a whole column of dates. Each distinct string is parsed only once:
+    the format that fits the sample best is applied to all of them in a single
+    vectorized pass, and the other formats are tried, in order, only on what is
+    still unparsed.
+
+    Args:
+        coluna (pd.Series): Column with dates as strings.
+        date_formats (list): Candidate formats, in priority order.
+        ignorar (tuple): Sentinel values that are not dates (e.g. 'Resgatado').
+        tamanho_amostra (int): Number of distinct values used to infer the format.
+        inferir (bool): Reorder date_formats by a sample of coluna; False tries them
+            in the given order (e.g. the output of formatos_coluna).
+        obrigatoria (bool): The column must hold a date: empty cells are also
+            returned as invalid (otherwise they just become NaT).
+
+    Returns:
+        tuple[pd.Series, pd.Series]: The parsed column (datetime64, NaT where it
+        couldn't be parsed, was empty or was a sentinel) and the raw values of the
+        rows that couldn't be parsed, indexed like coluna.
+    """
+    codigos, textos, sentinela = _distintos(coluna, ignorar)
+
+    datas = np.full(len(textos), np.datetime64('NaT'), dtype='datetime64[ns]')
+    pendentes = ~sentinela
+    if pendentes.any():
+        formatos = infer_date_formats(textos[pendentes], date_formats, tamanho_amostra) if inferir else date_formats
+        for fmt in formatos:
+            idx = np.flatnonzero(pendentes)
+            datas[idx] = _parse_format(textos[idx], fmt)
+            pendentes[idx] = np.isnat(datas[idx])
+            if not pendentes.any():
+                break
+
+    parsed = pd.Series(np.where(codigos >= 0, datas[codigos], np.datetime64('NaT')),
+                       index=coluna.index, name=coluna.name)
+    invalidos = (codigos >= 0) & pendentes[codigos]
+    if obrigatoria:
+        invalidos |= codigos < 0
+    return parsed, coluna[invalidos]
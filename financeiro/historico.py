@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+from financeiro.calendario import calendario_br, to_days
+from financeiro.valuation import calc_cumulative_rate_matrix, calc_valor_liquido_bulk
+
+
+#   Dimensões da quebra do patrimônio diário
+DIMENSOES = ['EMISSOR', 'TIPO_RENDIMENTO', 'OBJETIVO']
+
+
+def business_days(data_inicio, data_fim) -> np.ndarray:
+    """Business days (national calendar) in [data_inicio, data_fim], as datetime64[D]."""
+    dias = np.arange(to_days(data_inicio)[0], to_days(data_fim)[0] + 1, dtype='datetime64[D]')
+    return dias[np.is_busday(dias, busdaycal=calendario_br())]
+
+
+def em_carteira(ativo: pd.DataFrame, datas) -> np.ndarray:
+    """
+    Whether each position is in the portfolio at each date (positions x dates):
+    from its DATA_INICIO until the day before its DATA_RESGATE.
+    """
+    datas = to_days(datas)[np.newaxis, :]
+    data_inicio = to_days(ativo['DATA_INICIO'])[:, np.newaxis]
+    data_resgate = pd.to_datetime(ativo['DATA_RESGATE'], errors='coerce').to_numpy().astype('datetime64[D]')[:, np.newaxis]
+    return (datas >= data_inicio) & (np.isnat(data_resgate) | (datas < data_resgate))
+
+
+def valor_matriz(ativo: pd.DataFrame, datas, indice_ipca, indice_cdi):
+    """
+    Gross and net value of every position at every date (positions x dates).
+
+    A position counts from its DATA_INICIO until the day before its DATA_RESGATE;
+    outside that window its value is 0.
+
+    Args:
+        ativo (pd.DataFrame): Positions (names_raw columns).
+        datas: Valuation dates.
+        indice_ipca (IPCAIndex | pd.DataFrame): IPCA index or history.
+        indice_cdi (CDIIndex | pd.DataFrame): CDI index or history.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Gross and net values, shape (len(ativo), len(datas)).
+    """
+    datas = to_days(datas)[np.newaxis, :]
+    data_inicio = to_days(ativo['DATA_INICIO'])[:, np.newaxis]
+    aporte = ativo['APORTE'].to_numpy(dtype=float)[:, np.newaxis]
+    carteira = em_carteira(ativo, datas[0])
+
+    bruto = aporte * calc_cumulative_rate_matrix(ativo, datas[0], indice_ipca, indice_cdi)
+    dias = (datas - data_inicio).astype(int)
+    liquido = calc_valor_liquido_bulk(ativo['TIPO_PAPEL'].to_numpy()[:, np.newaxis], aporte, bruto, dias)
+    return np.where(carteira, bruto, 0.0), np.where(carteira, liquido, 0.0)
+
+
+def fins_de_mes(data_fim, meses: int) -> np.ndarray:
+    """
+    Month-end grid: the last day of each of the `meses` months before data_fim's
+    month, plus data_fim itself.
+
+    Args:
+        data_fim: Last date of the grid.
+        meses (int): Number of complete months before data_fim.
+
+    Returns:
+        np.ndarray: Sorted dates, datetime64[D].
+    """
+    fim = to_days(data_fim)[0]
+    mes = fim.astype('datetime64[M]')
+    fins = (np.arange(mes - meses, mes) + 1).astype('datetime64[D]') - 1
+    return np.append(fins, fim)
+
+
+def valorar_em_datas(ativo: pd.DataFrame, datas, indice_ipca, indice_cdi) -> pd.DataFrame:
+    """
+    Gross and net value of every position at every date, in one batched
+    computation (see valor_matriz). Only the (position, date) pairs where the
+    position is in the portfolio are returned.
+
+    Args:
+        ativo (pd.DataFrame): Positions (names_raw columns).
+        datas: Valuation dates.
+        indice_ipca (IPCAIndex | pd.DataFrame): IPCA index or history.
+        indice_cdi (CDIIndex | pd.DataFrame): CDI index or history.
+
+    Returns:
+        pd.DataFrame: Columns of ativo plus DATA, VALOR_BRUTO and VALOR_LIQUIDO, one
+        row per position and date.
+    """
+    datas = np.sort(to_days(datas))
+    bruto, liquido = valor_matriz(ativo, datas, indice_ipca, indice_cdi)
+    posicao, data = np.nonzero(em_carteira(ativo, datas))
+    return ativo.iloc[posicao].assign(DATA=datas[data].astype('datetime64[ns]'),
+                                      VALOR_BRUTO=bruto[posicao, data],
+                                      VALOR_LIQUIDO=liquido[posicao, data])
+
+
+def patrimonio_em_datas(ativo: pd.DataFrame, datas, indice_ipca, indice_cdi,
+                        dimensoes: list = DIMENSOES, tamanho_bloco: int = 2000) -> pd.DataFrame:
+    """
+    Mark-to-market of the portfolio at each date: gross and net value in total
+    and broken down by each dimension.
+
+    The positions are valued in blocks of tamanho_bloco rows, and each block is
+    summed into the groups before the next one, so memory depends on the block
+    size and not on the number of positions.
+
+    Args:
+        ativo (pd.DataFrame): Positions (names_raw columns).
+        datas: Valuation dates (e.g. business_days or fins_de_mes).
+        indice_ipca (IPCAIndex | pd.DataFrame): IPCA index or history.
+        indice_cdi (CDIIndex | pd.DataFrame): CDI index or history.
+        dimensoes (list): Columns used to break the values down.
+        tamanho_bloco (int): Number of positions valued at a time.
+
+    Returns:
+        pd.DataFrame: Long table with DATA, DIMENSAO ('TOTAL' or the column name),
+        CHAVE, VALOR_BRUTO and VALOR_LIQUIDO.
+    """
+    colunas = ['DATA', 'DIMENSAO', 'CHAVE', 'VALOR_BRUTO', 'VALOR_LIQUIDO']
+    if ativo.empty:
+        return pd.DataFrame(columns=colunas)
+
+    datas = np.sort(to_days(datas))
+    codigos, chaves = {}, {}
+    for dimensao in dimensoes:
+        codigos[dimensao], chaves[dimensao] = pd.factorize(ativo[dimensao])
+
+    # Somas por grupo: [dimensão] -> (bruto, líquido), cada um (grupos x datas)
+    somas = {'TOTAL': (np.zeros((1, len(datas))), np.zeros((1, len(datas))))}
+    for dimensao in dimensoes:
+        somas[dimensao] = (np.zeros((len(chaves[dimensao]), len(datas))),
+                           np.zeros((len(chaves[dimensao]), len(datas))))
+
+    for inicio in range(0, len(ativo), tamanho_bloco):
+        bloco = slice(inicio, inicio + tamanho_bloco)
+        bruto, liquido = valor_matriz(ativo.iloc[bloco], datas, indice_ipca, indice_cdi)
+        somas['TOTAL'][0][0] += bruto.sum(axis=0)
+        somas['TOTAL'][1][0] += liquido.sum(axis=0)
+        for dimensao in dimensoes:
+            codigo = codigos[dimensao][bloco]
+            grupos = (codigo == np.arange(len(chaves[dimensao]))[:, np.newaxis]).astype(float)
+            somas[dimensao][0][:] += grupos @ bruto
+            somas[dimensao][1][:] += grupos @ liquido
+
+    partes = []
+    for dimensao, (bruto, liquido) in somas.items():
+        nomes = ['TOTAL'] if dimensao == 'TOTAL' else list(chaves[dimensao])
+        partes.append(pd.DataFrame({
+            'DATA': np.tile(datas, len(nomes)),
+            'DIMENSAO': dimensao,
+            'CHAVE': np.repeat(nomes, len(datas)),
+            'VALOR_BRUTO': bruto.ravel(),
+            'VALOR_LIQUIDO': liquido.ravel(),
+        }))
+    return pd.concat(partes, ignore_index=True)[colunas]
+
+
+def patrimonio_diario(ativo: pd.DataFrame, data_fim, indice_ipca, indice_cdi,
+                      dimensoes: list = DIMENSOES, tamanho_bloco: int = 2000) -> pd.DataFrame:
+    """
+    Daily mark-to-market of the portfolio: patrimonio_em_datas for every business
+    day from the first DATA_INICIO to data_fim.
+    """
+    if ativo.empty:
+        return patrimonio_em_datas(ativo, [], indice_ipca, indice_cdi, dimensoes, tamanho_bloco)
+    datas = business_days(to_days(ativo['DATA_INICIO']).min(), data_fim)
+    return patrimonio_em_datas(ativo, datas, indice_ipca, indice_cdi, dimensoes, tamanho_bloco)
@@ -0,0 +1,107 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+#   Imposto de renda regressivo da renda fixa: (dias corridos até, alíquota); None = acima do último limite
+FAIXAS_IR = [(180, 0.225),
+             (360, 0.20),
+             (720, 0.175),
+             (None, 0.15)]
+
+#   IOF regressivo sobre o rendimento, pelo dia corrido do resgate (1 a 29); a partir do 30º dia é zero
+ALIQUOTAS_IOF = [0.96, 0.93, 0.90, 0.86, 0.83, 0.80, 0.76, 0.73, 0.70, 0.66,
+                 0.63, 0.60, 0.56, 0.53, 0.50, 0.46, 0.43, 0.40, 0.36, 0.33,
+                 0.30, 0.26, 0.23, 0.20, 0.16, 0.13, 0.10, 0.06, 0.03]
+
+#   Tributação por TIPO_PAPEL (em maiúsculas): (IR, IOF). Tipos fora da tabela não são tributados.
+TRIBUTACAO = {
+    'CDB': (True, True),
+    'RDB': (True, True),
+    'LC': (True, True),
+    'TESOURO': (True, True),
+    'TESOURO DIRETO': (True, True),
+    'DEBÊNTURE': (True, True),
+    'LCI': (False, False),
+    'LCA': (False, False),
+    'CRI': (False, False),
+    'CRA': (False, False),
+    'DEBÊNTURE INCENTIVADA': (False, False),
+    'POUPANÇA': (False, False),
+}
+
+_LIMITES_IR = np.array([dias for dias, _ in FAIXAS_IR if dias is not None])
+_ALIQUOTAS_IR = np.array([aliquota for _, aliquota in FAIXAS_IR])
+_ALIQUOTAS_IOF = np.array([0.0] + ALIQUOTAS_IOF + [0.0])
+
+#   Tipos sem regra já avisados no log
+_avisados = set()
+
+
+def aliquota_ir(dias) -> np.ndarray:
+    """IR rate for the holding days: sorted lookup of dias in FAIXAS_IR (limits inclusive)."""
+    return _ALIQUOTAS_IR[np.searchsorted(_LIMITES_IR, dias, side='left')]
+
+
+def aliquota_iof(dias) -> np.ndarray:
+    """IOF rate for the holding days (ALIQUOTAS_IOF for days 1 to 29, zero from day 30 on)."""
+    return _ALIQUOTAS_IOF[np.clip(dias, 0, len(ALIQUOTAS_IOF) + 1)]
+
+
+def regras(tipo_papel) -> tuple:
+    """
+    Which taxes apply to each position, from TRIBUTACAO. The lookup is done once
+    per distinct TIPO_PAPEL.
+
+    Args:
+        tipo_papel: TIPO_PAPEL of each position (any shape).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Boolean IR and IOF flags with the shape of tipo_papel.
+    """
+    tipos = np.asarray(tipo_papel, dtype=object)
+    codigos, unicos = pd.factorize(tipos.ravel())
+    chaves = [str(t).strip().upper() for t in unicos]
+
+    desconhecidos = sorted({c for c in chaves if c not in TRIBUTACAO} - _avisados)
+    if desconhecidos:
+        _avisados.update(desconhecidos)
+        logger.warning("TIPO_PAPEL sem regra de tributação (considerado isento): %s", desconhecidos)
+
+    # código -1 (tipo ausente) cai no último elemento, isento
+    tabela = np.array([TRIBUTACAO.get(c, (False, False)) for c in chaves] + [(False, False)], dtype=bool)
+    return tabela[codigos, 0].reshape(tipos.shape), tabela[codigos, 1].reshape(tipos.shape)
+
+
+def calcular_impostos(tipo_papel, aporte, valor_bruto, dias) -> tuple:
+    """
+    IOF and IR due on redemption, for all positions at once. Arguments are
+    broadcast together (e.g. positions x dates).
+
+    IOF is charged on the gain when redeemed before the 30th day; IR is charged
+    on the gain net of IOF at the FAIXAS_IR rate. Losses pay no tax.
+
+    Args:
+        tipo_papel: TIPO_PAPEL of each position.
+        aporte: Invested value.
+        valor_bruto: Gross value.
+        dias: Calendar days since DATA_INICIO.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: IOF and IR.
+    """
+    tem_ir, tem_iof = regras(tipo_papel)
+    dias = np.asarray(dias)
+    rendimento = np.maximum(np.asarray(valor_bruto, dtype=float) - np.asarray(aporte, dtype=float), 0.0)
+    iof = np.where(tem_iof, rendimento * aliquota_iof(dias), 0.0)
+    ir = np.where(tem_ir, (rendimento - iof) * aliquota_ir(dias), 0.0)
+    return iof, ir
+
+
+def valor_liquido(tipo_papel, aporte, valor_bruto, dias) -> np.ndarray:
+    """Gross value minus the IOF and IR of calcular_impostos."""
+    iof, ir = calcular_impostos(tipo_papel, aporte, valor_bruto, dias)
+    return np.asarray(valor_bruto, dtype=float) - iof - ir
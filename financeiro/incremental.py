@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from financeiro.calendario import to_days
+from financeiro.indices import CDIIndex, IPCAIndex
+from financeiro.series import FORMATO
+from financeiro.valuation import calc_cumulative_rate_bulk, calc_cumulative_rate_matrix
+
+logger = logging.getLogger(__name__)
+
+
+#   Campos do contrato que determinam o fator de uma posição (APORTE só multiplica o fator)
+CAMPOS_CONTRATO = ['TIPO_RENDIMENTO', 'TAXA_AA', 'DATA_INICIO']
+
+#   Versão do formato do cache; mudar descarta caches antigos
+VERSAO = 1
+
+
+def impressao_digital(*partes) -> str:
+    """SHA-1 of arrays/strings, to identify a version of the ledger, the indexes or the options."""
+    h = hashlib.sha1()
+    for parte in partes:
+        h.update(np.ascontiguousarray(parte).tobytes() if isinstance(parte, np.ndarray) else str(parte).encode())
+    return h.hexdigest()
+
+
+def impressao_cdi(indice_cdi: CDIIndex, ate=None) -> str:
+    """Fingerprint of the CDI history (up to the date ate, inclusive, when given)."""
+    fim = len(indice_cdi.datas) if ate is None else np.searchsorted(indice_cdi.datas, np.datetime64(ate, 'D'), side='right')
+    return impressao_digital(indice_cdi.datas[:fim], indice_cdi.taxas[:fim])
+
+
+def impressao_ipca(indice_ipca: IPCAIndex) -> str:
+    """Fingerprint of the whole IPCA history."""
+    return impressao_digital(indice_ipca.meses, indice_ipca.taxas)
+
+
+def chave_posicao(ativo: pd.DataFrame) -> np.ndarray:
+    """Hash of CAMPOS_CONTRATO of each position (uint64); equal contracts share the key."""
+    return pd.util.hash_pandas_object(ativo[CAMPOS_CONTRATO], index=False).to_numpy()
+
+
+class CacheValoracao:
+    """
+    Persistent cache of the cumulative factors of the positions, keyed by
+    chave_posicao, and the index versions they were computed with.
+
+    On the next valuation, unchanged positions are rolled forward from the cached
+    date with the incremental factor of the period, which is exact: CDI from the
+    last CDI date used (ancora_cdi, while the history up to it is unchanged), IPCA+
+    while the IPCA history is unchanged, Pré always. Everything else (new or
+    changed contracts, revised indexes, an earlier date) is valued from scratch.
+
+        cache = CacheValoracao.carregar(pasta)
+        fatores = cache.fatores(ativo, data_fim, indice_ipca, indice_cdi)
+        cache.salvar()
+
+    Args:
+        pasta (str): Folder of the cache files (cache_valoracao.json and the factors).
+    """
+
+    def __init__(self, pasta: str):
+        self.pasta = pasta
+        self.meta = {}
+        self.tabela = pd.Series(dtype=float)
+        self.reaproveitadas = 0
+        self.calculadas = 0
+
+    @property
+    def caminho_meta(self) -> str:
+        return os.path.join(self.pasta, 'cache_valoracao.json')
+
+    @property
+    def caminho_fatores(self) -> str:
+        return os.path.join(self.pasta, f'cache_valoracao.{FORMATO}')
+
+    @classmethod
+    def carregar(cls, pasta: str):
+        """Reads the cache from pasta; a missing, unreadable or old cache starts empty."""
+        cache = cls(pasta)
+        try:
+            with open(cache.caminho_meta, encoding='utf-8') as arquivo:
+                meta = json.load(arquivo)
+            if FORMATO == 'parquet':
+                tabela = pd.read_parquet(cache.caminho_fatores)
+            else:
+                tabela = pd.read_csv(cache.caminho_fatores, sep=';', dtype={'CHAVE': 'uint64'})
+        except (OSError, ValueError) as e:
+            logger.info("Cache de valoração vazio (%s)", e)
+            return cache
+        if meta.get('versao') == VERSAO:
+            cache.meta = meta
+            cache.tabela = pd.Series(tabela['FATOR'].to_numpy(), index=tabela['CHAVE'].to_numpy())
+        return cache
+
+    def salvar(self):
+        """Writes the cache (atomic replace of each file)."""
+        os.makedirs(self.pasta, exist_ok=True)
+        tabela = pd.DataFrame({'CHAVE': self.tabela.index.to_numpy(dtype='uint64'), 'FATOR': self.tabela.to_numpy()})
+        temporario = self.caminho_fatores + '.tmp'
+        if FORMATO == 'parquet':
+            tabela.to_parquet(temporario, index=False)
+        else:
+            tabela.to_csv(temporario, sep=';', index=False)
+        os.replace(temporario, self.caminho_fatores)
+        with open(self.caminho_meta + '.tmp', 'w', encoding='utf-8') as arquivo:
+            json.dump(self.meta, arquivo, indent=2)
+        os.replace(self.caminho_meta + '.tmp', self.caminho_meta)
+
+    def _reaproveitaveis(self, ativo: pd.DataFrame, chaves: np.ndarray, data_fim: np.datetime64,
+                         indice_ipca: IPCAIndex, indice_cdi: CDIIndex) -> tuple:
+        """Mask of the positions that can be rolled forward, and the start date of the roll of each one."""
+        reusar = np.zeros(len(ativo), dtype=bool)
+        base = np.full(len(ativo), data_fim)
+        if not self.meta or self.tabela.empty:
+            return reusar, base
+        data_anterior = np.datetime64(self.meta['data_fim'], 'D')
+        if data_fim < data_anterior:
+            return reusar, base
+
+        tipo = ativo['TIPO_RENDIMENTO'].to_numpy()
+        inicio = to_days(ativo['DATA_INICIO'])
+        em_cache = pd.Index(self.tabela.index).get_indexer(chaves) >= 0
+
+        ancora = self.meta.get('ancora_cdi')
+        if ancora and impressao_cdi(indice_cdi, ancora) == self.meta['cdi']:
+            ancora = np.datetime64(ancora, 'D')
+            cdi = (tipo == 'CDI') & (inicio <= ancora)
+            reusar |= cdi
+            base[cdi] = ancora
+
+        ipca = tipo == 'IPCA+taxa'
+        if impressao_ipca(indice_ipca) == self.meta['ipca']:
+            reusar |= ipca & (inicio <= data_anterior)
+        pre = (tipo == 'Pré') & (inicio <= data_anterior)
+        reusar |= pre
+        base[ipca | pre] = data_anterior
+        return reusar & em_cache, base
+
+    def fatores(self, ativo: pd.DataFrame, data_fim, indice_ipca, indice_cdi) -> pd.Series:
+        """
+        Cumulative factor of every position at data_fim, reusing the cache, and
+        updates the cache to data_fim (call salvar() to persist it).
+
+        Args:
+            ativo (pd.DataFrame): Active positions (typed dates, see transform).
+            data_fim: Valuation date.
+            indice_ipca (IPCAIndex | pd.DataFrame): IPCA index or history.
+            indice_cdi (CDIIndex | pd.DataFrame): CDI index or history.
+
+        Returns:
+            pd.Series: Factor aligned with ativo's index, equal to calc_cumulative_rate_bulk.
+
+        Raises:
+            ValueError: If some new CDI position has no data up to data_fim.
+        """
+        indice_cdi = CDIIndex.from_historico(indice_cdi)
+        indice_ipca = IPCAIndex.from_historico(indice_ipca)
+        data_fim = to_days(data_fim)[0]
+        chaves = chave_posicao(ativo)
+
+        reusar, base = self._reaproveitaveis(ativo, chaves, data_fim, indice_ipca, indice_cdi)
+        fatores = np.empty(len(ativo))
+        if reusar.any():
+            rolar = ativo[reusar].assign(DATA_INICIO=base[reusar])
+            incremento = calc_cumulative_rate_matrix(rolar, [data_fim], indice_ipca, indice_cdi)[:, 0]
+            fatores[reusar] = self.tabela.reindex(chaves[reusar]).to_numpy() * incremento
+        if (~reusar).any():
+            fatores[~reusar] = calc_cumulative_rate_bulk(ativo[~reusar], data_fim, indice_ipca, indice_cdi).to_numpy()
+        self.reaproveitadas, self.calculadas = int(reusar.sum()), int((~reusar).sum())
+
+        ancora = indice_cdi.datas[:np.searchsorted(indice_cdi.datas, data_fim, side='right')]
+        ancora = str(ancora[-1]) if len(ancora) else None
+        self.tabela = pd.Series(fatores, index=chaves).groupby(level=0).first()
+        self.meta = {'versao': VERSAO, 'data_fim': str(data_fim), 'ancora_cdi': ancora,
+                     'cdi': impressao_cdi(indice_cdi, ancora) if ancora else None,
+                     'ipca': impressao_ipca(indice_ipca)}
+        logger.info("Cache de valoração: %d posição(ões) roladas do cache, %d valoradas do zero",
+                    self.reaproveitadas, self.calculadas)
+        return pd.Series(fatores, index=ativo.index)
+
+
+def impressao_arquivo(caminho: str) -> str:
+    """SHA-1 of the contents of a file."""
+    with open(caminho, 'rb') as arquivo:
+        return hashlib.sha1(arquivo.read()).hexdigest()
+
+
+def assinatura_execucao(caminho_entrada: str, indice_ipca, indice_cdi, opcoes: dict) -> str:
+    """
+    Fingerprint of one run: ledger file contents, both indexes and the options
+    that change the outputs. Inputs that are not options (the reference day of
+    SITUACAO and the day counts, the contents of a premissas file) must be in opcoes.
+    """
+    return impressao_digital(impressao_arquivo(caminho_entrada), impressao_cdi(CDIIndex.from_historico(indice_cdi)),
+                             impressao_ipca(IPCAIndex.from_historico(indice_ipca)), sorted(opcoes.items()))
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+from financeiro.calendario import calendario_br, dias_uteis, to_days
+
+
+def normalizar_historico(df_historico: pd.DataFrame, coluna: str):
+    """
+    Returns the dates (sorted datetime64[D]) and rates of a SGS history.
+
+    The index may be a DatetimeIndex (bcb.sgs) or strings (CSV fallback).
+    """
+    datas = to_days(df_historico.index)
+    taxas = df_historico[coluna].to_numpy(dtype=float)
+    ordem = np.argsort(datas, kind='stable')
+    return datas[ordem], taxas[ordem]
+
+
+class CDIIndex:
+    """
+    Cumulative CDI factors built once from the daily CDI history.
+
+    For each distinct percentage of CDI (TAXA_AA) the log-factor prefix sums
+    are computed on first use and cached, so the factor of any period is two
+    binary searches and a subtraction.
+
+    Args:
+        df_historico (pd.DataFrame): Daily CDI history (% per day) indexed by dates.
+        coluna (str): Name of the rate column.
+    """
+
+    def __init__(self, df_historico: pd.DataFrame, coluna: str = 'CDI'):
+        self.datas, self.taxas = normalizar_historico(df_historico, coluna)
+        self._prefixos = {}
+
+    @classmethod
+    def from_historico(cls, historico):
+        """Returns historico itself if it is already a CDIIndex, otherwise builds one."""
+        return historico if isinstance(historico, cls) else cls(historico)
+
+    @property
+    def ultima_data(self) -> np.datetime64:
+        return self.datas[-1]
+
+    def prefixo(self, correcao_valor: float) -> np.ndarray:
+        """Prefix sums of log(1 + correcao_valor * CDI / 100), starting at 0."""
+        correcao_valor = float(correcao_valor)
+        if correcao_valor not in self._prefixos:
+            self._prefixos[correcao_valor] = np.concatenate(
+                ([0.0], np.cumsum(np.log1p(correcao_valor * self.taxas / 100))))
+        return self._prefixos[correcao_valor]
+
+    def posicoes(self, data_inicio, data_fim):
+        """
+        Returns the slice [ini, fim) of the history equivalent to
+        df_historico.loc[data_inicio:data_fim].
+        """
+        ini = np.searchsorted(self.datas, to_days(data_inicio), side='left')
+        fim = np.searchsorted(self.datas, to_days(data_fim), side='right')
+        return ini, fim
+
+    def fator(self, data_inicio, data_fim, correcao_valor, validar: bool = True) -> np.ndarray:
+        """
+        Vectorized calc_cumulative_rate_cdi: cumulative factor from data_inicio to
+        data_fim, excluding the last day of the period, and 1 for periods with
+        fewer than two days of data.
+
+        Args:
+            data_inicio: Start date(s).
+            data_fim: End date(s), broadcastable with data_inicio.
+            correcao_valor: Percentage(s) of CDI, broadcastable with data_inicio.
+            validar (bool): Raise for periods without data (otherwise their factor is 1).
+
+        Returns:
+            np.ndarray: Cumulative factor of each period.
+
+        Raises:
+            ValueError: If validar and some period has no data in the history.
+        """
+        ini, fim = self.posicoes(data_inicio, data_fim)
+        ini, fim, correcao_valor = np.broadcast_arrays(ini, fim, np.asarray(correcao_valor, dtype=float))
+
+        n_dias = fim - ini
+        if validar and (n_dias <= 0).any():
+            raise ValueError(f"No data found for {int((n_dias <= 0).sum())} period(s) in the CDI history")
+
+        fatores = np.ones(n_dias.shape)
+        calcular = n_dias >= 2
+        for pct in np.unique(correcao_valor[calcular]):
+            mask = calcular & (correcao_valor == pct)
+            prefixo = self.prefixo(pct)
+            fatores[mask] = np.exp(prefixo[fim[mask] - 1] - prefixo[ini[mask]])
+        return fatores
+
+
+class IPCAIndex:
+    """
+    Accrued IPCA built once from the monthly SGS 433 series.
+
+    The level of the index at a date is the product of every full month before
+    it, times the current month's inflation pro-rata by business days
+    (du elapsed in the month / du of the month). Months not yet published
+    keep the last known level. Any (start, end) period is then the ratio of
+    two levels.
+
+    Args:
+        df_historico (pd.DataFrame): Monthly IPCA history (% per month) indexed by the
+            first day of the reference month.
+        coluna (str): Name of the rate column.
+    """
+
+    def __init__(self, df_historico: pd.DataFrame, coluna: str = 'IPCA+taxa'):
+        datas, taxas = normalizar_historico(df_historico, coluna)
+        self.meses = datas.astype('datetime64[M]')
+        self.taxas = taxas
+        # log do índice acumulado no início de cada mês (0 = antes do primeiro mês)
+        self._log_acumulado = np.concatenate(([0.0], np.cumsum(np.log1p(taxas / 100))))
+
+    @classmethod
+    def from_historico(cls, historico):
+        """Returns historico itself if it is already an IPCAIndex, otherwise builds one."""
+        return historico if isinstance(historico, cls) else cls(historico)
+
+    @property
+    def ultimo_mes(self) -> np.datetime64:
+        return self.meses[-1]
+
+    def log_nivel(self, datas) -> np.ndarray:
+        """Log of the accrued IPCA level at each date."""
+        dias = to_days(datas)
+        mes = dias.astype('datetime64[M]')
+        m = np.searchsorted(self.meses, mes, side='right') - 1
+        publicado = (m >= 0) & (self.meses[np.maximum(m, 0)] == mes)
+
+        # Mês não publicado (ou posterior ao histórico): nível do fim do último mês conhecido
+        log_nivel = self._log_acumulado[m + 1]
+
+        if publicado.any():
+            inicio_mes = mes[publicado].astype('datetime64[D]')
+            fim_mes = (mes[publicado] + 1).astype('datetime64[D]')
+            du_mes = np.busday_count(inicio_mes, fim_mes, busdaycal=calendario_br())
+            du_corridos = np.busday_count(inicio_mes, dias[publicado], busdaycal=calendario_br())
+            mp = m[publicado]
+            log_nivel[publicado] = (self._log_acumulado[mp]
+                                    + du_corridos / du_mes * np.log1p(self.taxas[mp] / 100))
+        return log_nivel
+
+    def fator_ipca(self, data_inicio, data_fim) -> np.ndarray:
+        """IPCA accrued between data_inicio and data_fim, as a factor."""
+        return np.exp(self.log_nivel(data_fim) - self.log_nivel(data_inicio))
+
+    def fator(self, data_inicio, data_fim, correcao_valor) -> np.ndarray:
+        """
+        Cumulative factor of an IPCA+ position: accrued IPCA times the fixed
+        annual rate over the business days of the period (du/252).
+
+        Args:
+            data_inicio: Start date(s).
+            data_fim: End date(s), broadcastable with data_inicio.
+            correcao_valor: Fixed annual rate(s) (TAXA_AA).
+
+        Returns:
+            np.ndarray: Cumulative factor of each period.
+        """
+        data_inicio, data_fim = to_days(data_inicio), to_days(data_fim)
+        taxa_fixa = (1 + np.asarray(correcao_valor, dtype=float)) ** (dias_uteis(data_inicio, data_fim) / 252)
+        return self.fator_ipca(data_inicio, data_fim) * taxa_fixa
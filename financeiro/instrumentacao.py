@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+#   Logger do pacote; os módulos usam logging.getLogger(__name__) (financeiro.*)
+logger = logging.getLogger('financeiro')
+
+#   Etapas do pipeline registradas no relatório de execução
+ETAPAS = ['fetch', 'parse', 'derive', 'value', 'tax', 'aggregate', 'write']
+
+
+def configurar_log(nivel: str = 'INFO'):
+    """
+    Sends the pipeline log to stderr. Per-position messages are DEBUG, so the hot
+    path stays silent unless nivel is 'DEBUG'.
+
+    Args:
+        nivel (str): Logging level name ('DEBUG', 'INFO', 'WARNING', ...).
+    """
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s',
+                        level=getattr(logging, nivel.upper()))
+
+
+def _linhas(objeto):
+    return None if objeto is None else len(objeto)
+
+
+class Etapa:
+    """Measurements of one stage; the caller sets the rows produced with saida()."""
+
+    def __init__(self, nome: str, linhas_entrada=None):
+        self.nome = nome
+        self.linhas_entrada = linhas_entrada
+        self.linhas_saida = None
+        self.segundos = None
+        self.pico_memoria_mb = None
+
+    def saida(self, resultado):
+        """Records the rows out (a frame/sequence or the count itself) and returns resultado."""
+        self.linhas_saida = resultado if isinstance(resultado, int) else _linhas(resultado)
+        return resultado
+
+    def como_dict(self) -> dict:
+        return {'etapa': self.nome, 'segundos': self.segundos, 'linhas_entrada': self.linhas_entrada,
+                'linhas_saida': self.linhas_saida, 'pico_memoria_mb': self.pico_memoria_mb}
+
+
+class Execucao:
+    """
+    Run report of the pipeline: wall time, rows in/out and peak memory of each stage.
+
+        execucao = Execucao()
+        with execucao.etapa('parse', raw) as etapa:
+            df = etapa.saida(normalizar_datas(raw))
+        execucao.salvar('execucao.json')
+
+    Args:
+        medir_memoria (bool): Trace allocations (tracemalloc) to get each stage's
+            peak memory. Adds some overhead to Python-heavy stages.
+    """
+
+    def __init__(self, medir_memoria: bool = True):
+        self.medir_memoria = medir_memoria
+        self.inicio = pd.Timestamp.now()
+        self.etapas = []
+
+    @contextmanager
+    def etapa(self, nome: str, entrada=None):
+        """
+        Measures the block as stage nome.
+
+        Args:
+            nome (str): Stage name (see ETAPAS).
+            entrada: Input of the stage (frame or sequence), or its number of rows.
+        """
+        etapa = Etapa(nome, entrada if isinstance(entrada, int) or entrada is None else _linhas(entrada))
+        rastreando = self.medir_memoria and not tracemalloc.is_tracing()
+        if rastreando:
+            tracemalloc.start()
+        elif self.medir_memoria:
+            tracemalloc.reset_peak()
+        inicio = time.perf_counter()
+        try:
+            yield etapa
+        finally:
+            etapa.segundos = time.perf_counter() - inicio
+            if self.medir_memoria:
+                etapa.pico_memoria_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            if rastreando:
+                tracemalloc.stop()
+            self.etapas.append(etapa)
+            logger.info("%s: %.3fs, linhas %s -> %s", nome, etapa.segundos, etapa.linhas_entrada, etapa.linhas_saida)
+
+    def relatorio(self) -> dict:
+        """The run report as a dict (metadata and one entry per stage, in execution order)."""
+        return {'inicio': self.inicio.isoformat(timespec='seconds'),
+                'segundos': sum(e.segundos for e in self.etapas),
+                'python': platform.python_version(), 'pandas': pd.__version__,
+                'etapas': [e.como_dict() for e in self.etapas]}
+
+    def salvar(self, caminho: str):
+        """Writes the run report as JSON."""
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(self.relatorio(), arquivo, indent=2, ensure_ascii=False)
+        logger.info("Relatório de execução em %s", caminho)
@@ -0,0 +1,144 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from financeiro.agregacao import agregar
+from financeiro.calendario import calendario_br
+from financeiro.saida import gravar_tabelas, write_output
+from financeiro.schema import ler_carteira, validar
+from financeiro.transform import derivar_colunas, filtrar_ativos, normalizar_datas
+from financeiro.valuation import valorar_ativos
+
+
+#   Arquivos de carteira procurados quando a origem do lote é uma pasta
+PADRAO_CARTEIRAS = 'InvestNovo_*.csv'
+
+#   Índices de cada processo do pool, recebidos uma vez na inicialização (_iniciar)
+_indices = {}
+
+
+def listar_carteiras(origem: str) -> list:
+    """
+    Portfolio files of a batch.
+
+    Args:
+        origem (str): A folder (every PADRAO_CARTEIRAS file in it) or a manifest,
+            a text file with one path per line (relative to the manifest's folder;
+            blank lines and lines starting with '#' are ignored).
+
+    Returns:
+        list: Paths of the portfolio files.
+
+    Raises:
+        FileNotFoundError: If origem or a file listed in the manifest does not exist.
+    """
+    if os.path.isdir(origem):
+        return sorted(glob.glob(os.path.join(origem, PADRAO_CARTEIRAS)))
+    if not os.path.exists(origem):
+        raise FileNotFoundError(origem)
+
+    pasta = os.path.dirname(os.path.abspath(origem))
+    with open(origem, encoding='utf-8') as manifesto:
+        linhas = [linha.strip() for linha in manifesto]
+    carteiras = [os.path.join(pasta, linha) for linha in linhas if linha and not linha.startswith('#')]
+    faltando = [c for c in carteiras if not os.path.exists(c)]
+    if faltando:
+        raise FileNotFoundError(f"Portfolio files not found: {faltando}")
+    return carteiras
+
+
+def nome_carteira(caminho: str) -> str:
+    """Name of a portfolio (and of its output folder): the file name without extension."""
+    return os.path.splitext(os.path.basename(caminho))[0]
+
+
+def _iniciar(indice_ipca, indice_cdi):
+    """Pool initializer: keeps the indexes and builds the holiday calendar once per process."""
+    _indices['ipca'], _indices['cdi'] = indice_ipca, indice_cdi
+    calendario_br()
+
+
+def processar_carteira(caminho: str, pasta_saida: str, data_fim, indice_ipca, indice_cdi,
+                       exportar_csv: bool = False) -> dict:
+    """
+    Values one portfolio and writes df_ativo and the summary tables to its folder.
+
+    Args:
+        caminho (str): Portfolio file (InvestNovo_*.csv layout).
+        pasta_saida (str): Output folder of this portfolio.
+        data_fim: Valuation date.
+        indice_ipca (IPCAIndex): IPCA index.
+        indice_cdi (CDIIndex): CDI index.
+        exportar_csv (bool): Also write the CSVs.
+
+    Returns:
+        dict: CARTEIRA, LINHAS, ATIVOS, the totals of APORTE, VALOR_ATUAL_BRUTO and
+        VALOR_ATUAL_LIQUIDO, SEGUNDOS and ERRO (None when the portfolio was processed).
+    """
+    inicio = time.perf_counter()
+    resumo = {'CARTEIRA': nome_carteira(caminho), 'LINHAS': 0, 'ATIVOS': 0,
+              'APORTE': 0.0, 'VALOR_ATUAL_BRUTO': 0.0, 'VALOR_ATUAL_LIQUIDO': 0.0, 'ERRO': None}
+    try:
+        raw = ler_carteira(caminho)
+        # carteira lida uma vez: as violações do schema são relatadas aqui
+        df, _ = validar(normalizar_datas(raw))
+        ativo = valorar_ativos(filtrar_ativos(derivar_colunas(df), data_fim), data_fim, indice_ipca, indice_cdi)
+        write_output(ativo, pasta_saida, 'df_ativo', exportar_csv)
+        gravar_tabelas(agregar(ativo), pasta_saida, exportar_csv)
+
+        resumo.update(LINHAS=len(raw), ATIVOS=len(ativo),
+                      **ativo[['APORTE', 'VALOR_ATUAL_BRUTO', 'VALOR_ATUAL_LIQUIDO']].sum().to_dict())
+    except Exception as e:
+        # uma carteira com problema não interrompe o lote
+        resumo['ERRO'] = f"{type(e).__name__}: {e}"
+    resumo['SEGUNDOS'] = time.perf_counter() - inicio
+    return resumo
+
+
+def _processar(caminho: str, pasta_saida: str, data_fim, exportar_csv: bool) -> dict:
+    return processar_carteira(caminho, pasta_saida, data_fim, _indices['ipca'], _indices['cdi'], exportar_csv)
+
+
+def processar_lote(carteiras: list, pasta_saida: str, data_fim, indice_ipca, indice_cdi,
+                   max_workers: int = None, exportar_csv: bool = False) -> pd.DataFrame:
+    """
+    Values many portfolios in parallel, one process per CPU core (or max_workers).
+
+    The indexes are sent to each process once, when it starts, and not with
+    every portfolio. Each portfolio gets its folder pasta_saida/<name>, and the
+    consolidated summary, with one row per portfolio and its timing, is written
+    to pasta_saida/resumo_lote.
+
+    Args:
+        carteiras (list): Portfolio files (see listar_carteiras).
+        pasta_saida (str): Output folder of the batch.
+        data_fim: Valuation date.
+        indice_ipca (IPCAIndex): IPCA index.
+        indice_cdi (CDIIndex): CDI index.
+        max_workers (int): Number of processes (default: number of CPUs).
+        exportar_csv (bool): Also write the CSVs.
+
+    Returns:
+        pd.DataFrame: The consolidated summary, in the order of carteiras.
+    """
+    nomes = [nome_carteira(c) for c in carteiras]
+    repetidos = {n for n in nomes if nomes.count(n) > 1}
+    if repetidos:
+        raise ValueError(f"Portfolio names must be unique (one output folder each): {sorted(repetidos)}")
+
+    resumos = {}
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_iniciar,
+                             initargs=(indice_ipca, indice_cdi)) as pool:
+        futuros = {pool.submit(_processar, caminho, os.path.join(pasta_saida, nome), data_fim, exportar_csv): nome
+                   for caminho, nome in zip(carteiras, nomes)}
+        for futuro in as_completed(futuros):
+            resumos[futuros[futuro]] = futuro.result()
+
+    resumo = pd.DataFrame([resumos[nome] for nome in nomes],
+                          columns=['CARTEIRA', 'LINHAS', 'ATIVOS', 'APORTE', 'VALOR_ATUAL_BRUTO',
+                                   'VALOR_ATUAL_LIQUIDO', 'SEGUNDOS', 'ERRO'])
+    write_output(resumo, pasta_saida, 'resumo_lote', exportar_csv)
+    return resumo
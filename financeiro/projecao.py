@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from financeiro.calendario import calendario_br, to_days
+from financeiro.indices import CDIIndex, IPCAIndex
+from financeiro.valuation import calc_cumulative_rate_ate, calc_valor_liquido_bulk
+
+
+#   Premissas de juros: taxas anuais em % (CDI e IPCA) válidas a partir de cada DATA
+COLUNAS_PREMISSAS = ['CDI', 'IPCA']
+
+
+def premissas_planas(cdi_aa: float, ipca_aa: float) -> pd.DataFrame:
+    """
+    Flat rate assumptions: the same annual CDI and IPCA (% a year) for every future date.
+
+    Returns:
+        pd.DataFrame: Assumptions indexed by 'DATA' (see ler_premissas).
+    """
+    return pd.DataFrame({'CDI': [float(cdi_aa)], 'IPCA': [float(ipca_aa)]},
+                        index=pd.DatetimeIndex(['1900-01-01'], name='DATA'))
+
+
+def ler_premissas(caminho: str) -> pd.DataFrame:
+    """
+    Reads a term structure of assumptions: semicolon CSV with DATA (YYYY-MM-DD),
+    CDI and IPCA, the annual rates in % valid from each DATA until the next one.
+    The first row also holds for any date before it.
+
+    Args:
+        caminho (str): Path of the CSV.
+
+    Returns:
+        pd.DataFrame: Assumptions sorted and indexed by 'DATA'.
+
+    Raises:
+        ValueError: If a column is missing or the file has no rows.
+    """
+    premissas = pd.read_csv(caminho, sep=';', parse_dates=['DATA'], index_col='DATA').sort_index()
+    faltando = [c for c in COLUNAS_PREMISSAS if c not in premissas.columns]
+    if faltando or premissas.empty:
+        raise ValueError(f"Assumptions file {caminho} needs rows and the columns DATA, {COLUNAS_PREMISSAS}")
+    return premissas[COLUNAS_PREMISSAS].astype(float)
+
+
+def premissas_correntes(indice_cdi: CDIIndex, indice_ipca: IPCAIndex) -> pd.DataFrame:
+    """Flat assumptions at the current rates: last daily CDI annualized and IPCA of the last 12 months."""
+    cdi_aa = ((1 + indice_cdi.taxas[-1] / 100) ** 252 - 1) * 100
+    ipca_aa = (np.prod(1 + indice_ipca.taxas[-12:] / 100) - 1) * 100
+    return premissas_planas(cdi_aa, ipca_aa)
+
+
+def taxa_premissa(premissas: pd.DataFrame, coluna: str, datas) -> np.ndarray:
+    """Annual rate (%) of the assumptions in force at each date (step function)."""
+    inicio = to_days(premissas.index)
+    vigente = np.maximum(np.searchsorted(inicio, to_days(datas), side='right') - 1, 0)
+    return premissas[coluna].to_numpy(dtype=float)[vigente]
+
+
+def estender_cdi(indice_cdi, premissas: pd.DataFrame, data_fim) -> CDIIndex:
+    """
+    CDI index extended with projected daily rates (% a day, like SGS 11) for every
+    business day after the last observation, up to data_fim.
+    """
+    indice_cdi = CDIIndex.from_historico(indice_cdi)
+    dias = np.arange(indice_cdi.ultima_data + 1, to_days(data_fim)[0] + 1, dtype='datetime64[D]')
+    dias = dias[np.is_busday(dias, busdaycal=calendario_br())]
+    diaria = ((1 + taxa_premissa(premissas, 'CDI', dias) / 100) ** (1 / 252) - 1) * 100
+    return CDIIndex(pd.DataFrame({'CDI': np.concatenate([indice_cdi.taxas, diaria])},
+                                 index=pd.DatetimeIndex(np.concatenate([indice_cdi.datas, dias]))))
+
+
+def estender_ipca(indice_ipca, premissas: pd.DataFrame, data_fim) -> IPCAIndex:
+    """
+    IPCA index extended with projected monthly rates (% a month, like SGS 433) for
+    every month after the last published one, up to data_fim's month.
+    """
+    indice_ipca = IPCAIndex.from_historico(indice_ipca)
+    meses = np.arange(indice_ipca.ultimo_mes + 1, to_days(data_fim)[0].astype('datetime64[M]') + 1)
+    mensal = ((1 + taxa_premissa(premissas, 'IPCA', meses.astype('datetime64[D]')) / 100) ** (1 / 12) - 1) * 100
+    return IPCAIndex(pd.DataFrame({'IPCA+taxa': np.concatenate([indice_ipca.taxas, mensal])},
+                                  index=pd.DatetimeIndex(np.concatenate([indice_ipca.meses, meses]).astype('datetime64[D]'))))
+
+
+def projetar_resgates(ativo: pd.DataFrame, indice_ipca, indice_cdi, premissas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Projects the gross and net value of every position at its DATA_RESGATE, in one
+    pass: the CDI and IPCA histories are extended with the assumptions and each
+    position is valued from DATA_INICIO to its own redemption date.
+
+    Args:
+        ativo (pd.DataFrame): Active positions (typed dates, see transform).
+        indice_ipca (IPCAIndex | pd.DataFrame): IPCA index or history.
+        indice_cdi (CDIIndex | pd.DataFrame): CDI index or history.
+        premissas (pd.DataFrame): Rate assumptions (premissas_planas, ler_premissas
+            or premissas_correntes).
+
+    Returns:
+        pd.DataFrame: Positions with a DATA_RESGATE, plus VALOR_BRUTO_RESGATE and
+        VALOR_LIQUIDO_RESGATE.
+    """
+    ativo = ativo[ativo['DATA_RESGATE'].notna()]
+    if ativo.empty:
+        return ativo.assign(VALOR_BRUTO_RESGATE=pd.Series(dtype=float), VALOR_LIQUIDO_RESGATE=pd.Series(dtype=float))
+
+    resgate = to_days(ativo['DATA_RESGATE'])
+    cdi = estender_cdi(indice_cdi, premissas, resgate.max())
+    ipca = estender_ipca(indice_ipca, premissas, resgate.max())
+
+    bruto = ativo['APORTE'].to_numpy(dtype=float) * calc_cumulative_rate_ate(ativo, resgate, ipca, cdi).to_numpy()
+    dias = (resgate - to_days(ativo['DATA_INICIO'])).astype(int)
+    liquido = calc_valor_liquido_bulk(ativo['TIPO_PAPEL'].to_numpy(), ativo['APORTE'].to_numpy(), bruto, dias)
+    return ativo.assign(VALOR_BRUTO_RESGATE=bruto, VALOR_LIQUIDO_RESGATE=liquido)
+
+
+def fluxo_resgates(projecao: pd.DataFrame) -> pd.DataFrame:
+    """
+    Monthly cashflow ladder: number of positions, APORTE and projected gross and
+    net value received in each redemption month.
+
+    Args:
+        projecao (pd.DataFrame): Output of projetar_resgates.
+
+    Returns:
+        pd.DataFrame: ANO_RESGATE, MES_RESGATE, N, APORTE, VALOR_BRUTO_RESGATE and
+        VALOR_LIQUIDO_RESGATE, in date order.
+    """
+    return (projecao.groupby(['ANO_RESGATE', 'MES_RESGATE'], observed=True)
+            .agg(N=('APORTE', 'size'), APORTE=('APORTE', 'sum'),
+                 VALOR_BRUTO_RESGATE=('VALOR_BRUTO_RESGATE', 'sum'),
+                 VALOR_LIQUIDO_RESGATE=('VALOR_LIQUIDO_RESGATE', 'sum'))
+            .reset_index())
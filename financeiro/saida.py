@@ -0,0 +1,189 @@
+import importlib.util
+import os
+
+import pandas as pd
+
+from financeiro.schema import SCHEMA, aplicar_schema
+from financeiro.series import FORMATO
+
+
+#   Schema das saídas lidas pelos dashboards: o da carteira mais as colunas das tabelas de resumo
+SCHEMA_SAIDA = {**SCHEMA, 'TIPO_ACUMULADO': 'category', 'DIMENSAO': 'category', 'CHAVE': 'category',
+                'DATA': 'datetime64[ns]'}
+
+#   Linhas por row group do Parquet (unidade mínima de leitura com filtro)
+ROW_GROUP_SIZE = 50_000
+
+
+def tipar_saida(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applies the output schema (SCHEMA_SAIDA, see schema.aplicar_schema):
+    categoricals for the descriptive columns, real dates (the 'Resgatado' sentinel
+    becomes NaT) and fixed-width numbers.
+    Column names become strings (e.g. the years of df_resgate_anomes).
+
+    Args:
+        df (pd.DataFrame): Output table.
+
+    Returns:
+        pd.DataFrame: Typed copy of df.
+    """
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    return aplicar_schema(df, SCHEMA_SAIDA)
+
+
+def write_output(df: pd.DataFrame, pasta: str, nome: str, exportar_csv: bool = False):
+    """
+    Writes an output table for the dashboards as typed Parquet (nome.parquet), with
+    row groups of ROW_GROUP_SIZE rows, and optionally also as the old semicolon CSV.
+    Without a Parquet engine installed only the CSV is written.
+
+    Args:
+        df (pd.DataFrame): Output table (the index is not written).
+        pasta (str): Output folder.
+        nome (str): File name without extension (e.g. 'df_ativo').
+        exportar_csv (bool): Also write nome.csv.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    # CSV antes do Parquet: os dashboards leem o mais recente dos dois
+    if exportar_csv or FORMATO != 'parquet':
+        df.to_csv(os.path.join(pasta, f'{nome}.csv'), sep=';', index=False)
+    if FORMATO == 'parquet':
+        tipar_saida(df).to_parquet(os.path.join(pasta, f'{nome}.parquet'), index=False,
+                                   row_group_size=ROW_GROUP_SIZE)
+
+
+def remover_saida(pasta: str, nome: str) -> bool:
+    """Removes nome.parquet and nome.csv from pasta (an output this run doesn't produce); True if any existed."""
+    removidos = [c for c in (os.path.join(pasta, f'{nome}.{e}') for e in ('parquet', 'csv')) if os.path.exists(c)]
+    for caminho in removidos:
+        os.remove(caminho)
+    return bool(removidos)
+
+
+#   Arquivo da pasta de saída com a assinatura da execução que gravou as saídas
+CARIMBO = 'assinatura_saidas.txt'
+
+
+def ler_carimbo(pasta: str) -> str:
+    """Signature of the run that wrote the outputs in pasta, or None (no stamp or a run that left none)."""
+    try:
+        with open(os.path.join(pasta, CARIMBO), encoding='utf-8') as arquivo:
+            return arquivo.read().strip() or None
+    except OSError:
+        return None
+
+
+def gravar_carimbo(pasta: str, assinatura: str = None):
+    """
+    Records which run wrote the outputs in pasta (see incremental.assinatura_execucao).
+    Call with None before writing any output, so an interrupted or unsigned run
+    never leaves the stamp of an earlier one next to its files.
+    """
+    caminho = os.path.join(pasta, CARIMBO)
+    if assinatura is None:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        return
+    os.makedirs(pasta, exist_ok=True)
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as arquivo:
+        arquivo.write(assinatura)
+    os.replace(caminho + '.tmp', caminho)
+
+
+#   Tabelas de resumo (agregacao.finalizar) lidas pelos dashboards
+TABELAS = ['df_total', 'df_dist_tipo_taxa', 'df_dist_tipo_papel', 'df_resgate_anomes',
+           'df_taxa_media', 'df_taxa_media2', 'df_cubo', 'df_cubo_taxas']
+
+
+def gravar_tabelas(tabelas: dict, pasta: str, exportar_csv: bool = False):
+    """
+    Writes the summary tables the dashboards read (TABELAS) with write_output.
+
+    Args:
+        tabelas (dict): Output of agregacao.agregar()/finalizar().
+        pasta (str): Output folder.
+        exportar_csv (bool): Also write the CSVs.
+    """
+    for nome in TABELAS:
+        tabela = tabelas[nome]
+        if nome == 'df_taxa_media2':
+            tabela = tabela.reset_index()
+        write_output(tabela, pasta, nome, exportar_csv)
+
+
+class SaidaIncremental:
+    """
+    Writes an output table chunk by chunk, so the whole table never has to be in
+    memory: each write() becomes one or more row groups of nome.parquet (and rows
+    appended to nome.csv when exportar_csv is set or there is no Parquet engine).
+    The Parquet is written with pyarrow, or appended with fastparquet when that is
+    the only engine (same check as series.FORMATO).
+
+    The Parquet schema is taken from the first non-empty chunk; categoricals are
+    stored as string dictionaries so chunks with different categories fit it.
+
+    Args:
+        pasta (str): Output folder.
+        nome (str): File name without extension (e.g. 'df_ativo').
+        exportar_csv (bool): Also write nome.csv.
+    """
+
+    def __init__(self, pasta: str, nome: str, exportar_csv: bool = False):
+        os.makedirs(pasta, exist_ok=True)
+        self.caminho_parquet = os.path.join(pasta, f'{nome}.parquet')
+        self.caminho_csv = os.path.join(pasta, f'{nome}.csv')
+        self.parquet = FORMATO == 'parquet'
+        self.pyarrow = importlib.util.find_spec('pyarrow') is not None
+        self.csv = exportar_csv or not self.parquet
+        self.pasta, self.nome, self.exportar_csv = pasta, nome, exportar_csv
+        self._writer = None
+        self._iniciado = False
+        self._vazio = None
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            self._vazio = df if self._vazio is None else self._vazio
+            return
+        # CSV antes do Parquet, como em write_output
+        if self.csv:
+            df.to_csv(self.caminho_csv, sep=';', index=False, mode='a' if self._iniciado else 'w',
+                      header=not self._iniciado)
+        if self.parquet and self.pyarrow:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            tipado = tipar_saida(df)
+            if self._writer is None:
+                schema = pa.Schema.from_pandas(tipado, preserve_index=False)
+                for i, campo in enumerate(schema):
+                    if pa.types.is_dictionary(campo.type):
+                        schema = schema.set(i, campo.with_type(pa.dictionary(pa.int32(), pa.string())))
+                self._writer = pq.ParquetWriter(self.caminho_parquet, schema)
+            self._writer.write_table(pa.Table.from_pandas(tipado, schema=self._writer.schema, preserve_index=False),
+                                     row_group_size=ROW_GROUP_SIZE)
+        elif self.parquet:
+            import fastparquet
+
+            # categorias diferentes em cada bloco: gravadas como texto
+            tipado = tipar_saida(df)
+            tipado = tipado.astype({c: object for c in tipado.columns
+                                    if isinstance(tipado[c].dtype, pd.CategoricalDtype)})
+            fastparquet.write(self.caminho_parquet, tipado, row_group_offsets=ROW_GROUP_SIZE,
+                              write_index=False, append=self._iniciado)
+        self._iniciado = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        elif not self._iniciado and self._vazio is not None:
+            # nenhuma linha: grava a tabela vazia como write_output
+            write_output(self._vazio, self.pasta, self.nome, self.exportar_csv)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
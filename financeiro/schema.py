@@ -0,0 +1,162 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+#   Schema da carteira em memória: colunas do arquivo (names_raw) e derivadas.
+#   Textos repetidos viram category, datas datetime64 e números têm largura fixa
+#   (valores e taxas em float64; anos, meses e dias em inteiros anuláveis curtos).
+COLUNAS_ARQUIVO = {
+    'EMISSOR': 'category',
+    'TIPO_PAPEL': 'category',
+    'TIPO_RENDIMENTO': 'category',
+    'OBJETIVO': 'category',
+    'APORTE': 'float64',
+    'TAXA_AA': 'float64',
+    'DATA_INICIO': 'datetime64[ns]',
+    'DATA_RESGATE': 'datetime64[ns]',
+}
+COLUNAS_DERIVADAS = {
+    'RESGATADO': 'bool',
+    'SITUACAO': 'category',
+    'ANO_RESGATE': 'Int16',
+    'MES_RESGATE': 'Int16',
+    'DIAS_EM_CARTEIRA': 'Int32',
+    'DIAS_ATE_VENCIMENTO': 'Int32',
+    'VALOR_ATUAL_BRUTO': 'float64',
+    'VALOR_ATUAL_LIQUIDO': 'float64',
+}
+SCHEMA = {**COLUNAS_ARQUIVO, **COLUNAS_DERIVADAS}
+
+CATEGORICAS = [c for c, tipo in SCHEMA.items() if tipo == 'category']
+DATAS = [c for c, tipo in SCHEMA.items() if tipo.startswith('datetime64')]
+NUMERICAS = [c for c, tipo in COLUNAS_ARQUIVO.items() if tipo == 'float64']
+
+#   Valores de SITUACAO (categoria fixa)
+SITUACOES = ['Ativo', 'Resgatado']
+
+#   TIPO_RENDIMENTO que a valoração sabe calcular; os outros ficam com valor zero
+TIPOS_RENDIMENTO = ['CDI', 'IPCA+taxa', 'Pré']
+
+#   Colunas sem as quais a posição não pode ser valorada (DATA_INICIO conferida já como data)
+OBRIGATORIAS = ['EMISSOR', 'TIPO_PAPEL', 'TIPO_RENDIMENTO', 'APORTE', 'TAXA_AA', 'DATA_INICIO']
+
+#   Tipos na leitura do CSV. As datas entram como category de texto: cada string
+#   distinta é interpretada uma vez em normalizar_datas. Os números ficam com o tipo
+#   inferido, para que um valor mal formatado vá para o relatório de validar() em
+#   vez de interromper a leitura.
+DTYPES_LEITURA = {c: 'category' for c in CATEGORICAS + DATAS if c in COLUNAS_ARQUIVO}
+
+
+def ler_carteira(caminho: str, colunas: list = None) -> pd.DataFrame:
+    """
+    Reads a ledger (semicolon CSV) straight into the compact schema: descriptive
+    columns and dates as categoricals, numbers as float64 when they parse.
+
+    Args:
+        caminho (str): Path of the ledger.
+        colunas (list): Columns to read (e.g. names_raw; default: all).
+
+    Returns:
+        pd.DataFrame: The raw ledger (dates still as text, see transform.normalizar_datas).
+    """
+    dtypes = {c: t for c, t in DTYPES_LEITURA.items() if colunas is None or c in colunas}
+    return pd.read_csv(caminho, sep=';', usecols=colunas, dtype=dtypes)
+
+
+def aplicar_schema(df: pd.DataFrame, schema: dict = SCHEMA) -> pd.DataFrame:
+    """
+    Casts the columns of df that are in schema to their types, in place. Text
+    dates are parsed as ISO (invalid ones become NaT) and non-numeric values NaN.
+
+    Args:
+        df (pd.DataFrame): Positions or an output table.
+        schema (dict): {coluna: dtype} (default: SCHEMA).
+
+    Returns:
+        pd.DataFrame: df.
+    """
+    for coluna in df.columns:
+        tipo = schema.get(coluna)
+        if tipo is None or str(df[coluna].dtype) == tipo:
+            continue
+        if tipo.startswith('datetime64'):
+            df[coluna] = pd.to_datetime(df[coluna], errors='coerce', format='ISO8601')
+        elif tipo == 'float64':
+            df[coluna] = pd.to_numeric(df[coluna], errors='coerce').astype(tipo)
+        else:
+            df[coluna] = df[coluna].astype(tipo)
+    return df
+
+
+def relatar_violacoes(violacoes: pd.DataFrame, nivel: int = logging.WARNING):
+    """Logs violations (output of validar) as one entry: the count per rule and an example of each."""
+    if violacoes.empty:
+        return
+    resumo = violacoes.groupby(['COLUNA', 'REGRA', 'DESCARTADA'], sort=False).agg(
+        LINHAS=('LINHA', 'size'), EXEMPLO=('VALOR', 'first'))
+    logger.log(nivel, "%d violação(ões) do schema, %d linha(s) descartada(s):\n%s",
+               len(violacoes), violacoes.loc[violacoes['DESCARTADA'], 'LINHA'].nunique(), resumo.to_string())
+
+
+def validar(df: pd.DataFrame, nivel: int = logging.WARNING) -> tuple:
+    """
+    Checks every row against the schema at once and reports all violations
+    together (one log entry with the count per rule and examples, see
+    relatar_violacoes).
+
+    Rows that break a rule that prevents the valuation are dropped: required
+    column empty (DATA_INICIO included: NaT after parsing), APORTE or TAXA_AA
+    not a number, APORTE not positive, negative TAXA_AA and DATA_RESGATE
+    before DATA_INICIO. A TIPO_RENDIMENTO outside
+    TIPOS_RENDIMENTO is only reported (the position is kept, with value zero).
+
+    Args:
+        df (pd.DataFrame): Ledger with typed dates (output of normalizar_datas).
+        nivel (int): Log level of the report (e.g. logging.DEBUG when the same
+            ledger was already reported at ingestion).
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The valid rows, with the numeric columns as
+        float64, and the violations: LINHA (index of the row), COLUNA, REGRA, VALOR
+        and DESCARTADA.
+
+    Raises:
+        ValueError: If a column of COLUNAS_ARQUIVO is missing.
+    """
+    faltando = [c for c in COLUNAS_ARQUIVO if c not in df.columns]
+    if faltando:
+        raise ValueError(f"Ledger without the columns {faltando}")
+
+    df = df.copy()
+    # (coluna, regra, linhas que violam, valores originais da coluna, descarta a linha)
+    regras = []
+    for coluna in OBRIGATORIAS:
+        regras.append((coluna, 'obrigatoria', df[coluna].isna().to_numpy(), df[coluna], True))
+    for coluna in NUMERICAS:
+        numeros = pd.to_numeric(df[coluna], errors='coerce')
+        regras.append((coluna, 'numerica', (numeros.isna() & df[coluna].notna()).to_numpy(), df[coluna], True))
+        df[coluna] = numeros.astype('float64')
+    regras.append(('APORTE', 'positiva', (df['APORTE'] <= 0).to_numpy(), df['APORTE'], True))
+    regras.append(('TAXA_AA', 'nao_negativa', (df['TAXA_AA'] < 0).to_numpy(), df['TAXA_AA'], True))
+    regras.append(('DATA_RESGATE', 'depois_do_inicio', (df['DATA_RESGATE'] < df['DATA_INICIO']).to_numpy(),
+                   df['DATA_RESGATE'], True))
+    regras.append(('TIPO_RENDIMENTO', 'dominio',
+                   (df['TIPO_RENDIMENTO'].notna() & ~df['TIPO_RENDIMENTO'].isin(TIPOS_RENDIMENTO)).to_numpy(),
+                   df['TIPO_RENDIMENTO'], False))
+
+    contagens = [m.sum() for _, _, m, _, _ in regras]
+    violacoes = pd.DataFrame({
+        'LINHA': np.concatenate([df.index[m] for _, _, m, _, _ in regras]),
+        'COLUNA': np.repeat([c for c, _, _, _, _ in regras], contagens),
+        'REGRA': np.repeat([r for _, r, _, _, _ in regras], contagens),
+        'VALOR': np.concatenate([v.astype(object).to_numpy()[m] for _, _, m, v, _ in regras]).astype(str),
+        'DESCARTADA': np.repeat([d for _, _, _, _, d in regras], contagens),
+    })
+
+    descartar = np.logical_or.reduce([m for _, _, m, _, d in regras if d])
+    relatar_violacoes(violacoes, nivel)
+    return df[~descartar], violacoes
@@ -0,0 +1,199 @@
+import importlib.util
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+#   Parquet se houver engine instalada; senão o armazenamento cai para CSV
+FORMATO = 'parquet' if (importlib.util.find_spec('pyarrow') or importlib.util.find_spec('fastparquet')) else 'csv'
+
+
+def _normalizar(data: pd.DataFrame) -> pd.DataFrame:
+    """Single 'VALOR' column indexed by a sorted, unique DatetimeIndex named 'Date'."""
+    serie = pd.DataFrame({'VALOR': data.iloc[:, 0].to_numpy(dtype=float)},
+                         index=pd.DatetimeIndex(pd.to_datetime(data.index), name='Date'))
+    serie = serie[~serie.index.duplicated(keep='last')]
+    return serie.sort_index()
+
+
+class SeriesStore:
+    """
+    Local store of SGS series (Banco Central), one columnar file per SGS code.
+
+    update() fetches only the observations after the last stored date and
+    appends them; read() never touches the network.
+
+    Args:
+        pasta (str): Folder of the stored series.
+        fetcher (callable): Function with the signature of get_taxa_time_series_bcb,
+            fetcher(start_date, {nome: codigo}) -> DataFrame. None works offline only.
+        start_date (str): First date fetched when a series is not stored yet.
+    """
+
+    def __init__(self, pasta: str, fetcher=None, start_date: str = '2017-01-01'):
+        self.pasta = pasta
+        self.fetcher = fetcher
+        self.start_date = start_date
+
+    def caminho(self, codigo: int) -> str:
+        return os.path.join(self.pasta, f'sgs_{codigo}.{FORMATO}')
+
+    def exists(self, codigo: int) -> bool:
+        return os.path.exists(self.caminho(codigo))
+
+    def _ler(self, codigo: int) -> pd.DataFrame:
+        if FORMATO == 'parquet':
+            return pd.read_parquet(self.caminho(codigo))
+        return pd.read_csv(self.caminho(codigo), sep=';', index_col='Date', parse_dates=['Date'])
+
+    def _gravar(self, codigo: int, serie: pd.DataFrame):
+        os.makedirs(self.pasta, exist_ok=True)
+        temporario = self.caminho(codigo) + '.tmp'
+        if FORMATO == 'parquet':
+            serie.to_parquet(temporario)
+        else:
+            serie.to_csv(temporario, sep=';')
+        os.replace(temporario, self.caminho(codigo))
+
+    def read(self, codigo: int, nome: str) -> pd.DataFrame:
+        """
+        Reads a stored series.
+
+        Args:
+            codigo (int): SGS code.
+            nome (str): Name of the returned column (e.g. 'CDI').
+
+        Returns:
+            pd.DataFrame: The series, indexed by date, in a column called nome.
+
+        Raises:
+            FileNotFoundError: If the series was never stored.
+        """
+        if not self.exists(codigo):
+            raise FileNotFoundError(f"Series {codigo} not found in {self.pasta}")
+        return self._ler(codigo).rename(columns={'VALOR': nome})
+
+    def ultima_data(self, codigo: int):
+        """Last stored date of the series, or None."""
+        if not self.exists(codigo):
+            return None
+        return self._ler(codigo).index.max()
+
+    def update(self, codigo: int, nome: str) -> pd.DataFrame:
+        """
+        Fetches the observations after the last stored date, appends them and
+        returns the whole series.
+
+        Args:
+            codigo (int): SGS code.
+            nome (str): Name of the returned column (e.g. 'CDI').
+
+        Returns:
+            pd.DataFrame: The updated series, indexed by date, in a column called nome.
+
+        Raises:
+            ValueError: If there is no fetcher, or nothing was stored nor fetched.
+            Errors raised by the fetcher are propagated.
+        """
+        if self.fetcher is None:
+            raise ValueError("SeriesStore without fetcher works offline only")
+
+        armazenada = self._ler(codigo) if self.exists(codigo) else None
+        if armazenada is None or armazenada.empty:
+            inicio = self.start_date
+        else:
+            inicio = (armazenada.index.max() + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+        novos = self.fetcher(inicio, {nome: codigo})
+
+        if novos is not None and not novos.empty:
+            novos = _normalizar(novos)
+            novos = novos[novos.index >= pd.Timestamp(inicio)]
+            serie = novos if armazenada is None else pd.concat([armazenada, novos])
+            self._gravar(codigo, serie)
+        elif armazenada is None:
+            raise ValueError(f"No data returned for series {codigo} since {inicio}")
+        else:
+            serie = armazenada
+        return serie.rename(columns={'VALOR': nome})
+
+
+def com_timeout(funcao, timeout: float):
+    """
+    Wraps funcao so that each call gives up after timeout seconds.
+
+    The call runs in a daemon thread; on timeout it is abandoned (bcb.sgs has
+    no way to cancel a request) and TimeoutError is raised.
+    """
+    def chamada(*args, **kwargs):
+        resultado = {}
+
+        def executar():
+            try:
+                resultado['valor'] = funcao(*args, **kwargs)
+            except Exception as e:
+                resultado['erro'] = e
+
+        thread = threading.Thread(target=executar, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            raise TimeoutError(f"No answer after {timeout}s")
+        if 'erro' in resultado:
+            raise resultado['erro']
+        return resultado['valor']
+    return chamada
+
+
+def _update_serie(store: SeriesStore, codigo: int, nome: str, tentativas: int, espera: float):
+    """update() with bounded retries and exponential backoff; falls back to the stored copy."""
+    erro = 'offline'
+    for tentativa in range(tentativas if store.fetcher is not None else 0):
+        try:
+            return store.update(codigo, nome), 'atualizada'
+        except Exception as e:
+            erro = e
+            if tentativa < tentativas - 1:
+                time.sleep(espera * 2 ** tentativa)
+
+    if store.exists(codigo):
+        return store.read(codigo, nome), f'cache ({erro})'
+    return None, f'erro ({erro})'
+
+
+def update_many(store: SeriesStore, series: dict, timeout: float = 30, tentativas: int = 3,
+                espera: float = 1.0, max_workers: int = None):
+    """
+    Updates several SGS series concurrently, so the total time is that of the
+    slowest series instead of the sum of all of them.
+
+    Each request gives up after timeout seconds and is retried up to tentativas
+    times, waiting espera, 2*espera, 4*espera... between attempts. A series that
+    still fails is read from the store, if it was stored before.
+
+    Args:
+        store (SeriesStore): Store of the series (its fetcher is used for the requests).
+        series (dict): {nome: codigo SGS}.
+        timeout (float): Timeout of each request, in seconds.
+        tentativas (int): Maximum number of attempts per series.
+        espera (float): Initial wait between attempts, in seconds.
+        max_workers (int): Number of threads (default: one per series).
+
+    Returns:
+        tuple[dict, dict]: {nome: DataFrame or None} and {nome: status}, where status
+        is 'atualizada', 'cache (...)' or 'erro (...)'.
+    """
+    if store.fetcher is not None:
+        store = SeriesStore(store.pasta, com_timeout(store.fetcher, timeout), store.start_date)
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(series))) as executor:
+        futuros = {nome: executor.submit(_update_serie, store, codigo, nome, tentativas, espera)
+                   for nome, codigo in series.items()}
+        resultados = {nome: futuro.result() for nome, futuro in futuros.items()}
+
+    historicos = {nome: r[0] for nome, r in resultados.items()}
+    status = {nome: r[1] for nome, r in resultados.items()}
+    return historicos, status
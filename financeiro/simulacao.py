@@ -0,0 +1,286 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from financeiro.calendario import calendario_br, to_days
+from financeiro.indices import CDIIndex, IPCAIndex
+from financeiro.valuation import calc_cumulative_rate_matrix, calc_valor_liquido_bulk
+
+
+#   Percentis das faixas de resultado
+PERCENTIS = [5, 25, 50, 75, 95]
+
+#   Caminhos simulados por tarefa (a memória de cada processo é proporcional a caminhos x posições)
+CAMINHOS_POR_BLOCO = 500
+
+#   Contexto de cada processo do pool, recebido uma vez na inicialização (_iniciar)
+_contexto = {}
+
+
+class ModeloJuros:
+    """
+    Joint monthly model of the CDI (annual rate, % a year) and the IPCA (% a month):
+    one AR(1) per series, x[m+1] = c + phi * x[m] + e, with correlated normal
+    shocks, fitted by least squares on the monthly history. Within a month the
+    daily CDI is constant.
+
+    Args:
+        constante (np.ndarray): c of CDI and IPCA.
+        phi (np.ndarray): phi of CDI and IPCA.
+        covariancia (np.ndarray): 2x2 covariance of the shocks.
+        inicial (np.ndarray): Last observed CDI and IPCA (start of every path).
+    """
+
+    def __init__(self, constante, phi, covariancia, inicial):
+        self.constante = np.asarray(constante, dtype=float)
+        self.phi = np.asarray(phi, dtype=float)
+        self.covariancia = np.asarray(covariancia, dtype=float)
+        self.inicial = np.asarray(inicial, dtype=float)
+
+    @classmethod
+    def ajustar(cls, indice_cdi, indice_ipca):
+        """
+        Fits the model to the SGS history.
+
+        Args:
+            indice_cdi (CDIIndex | pd.DataFrame): Daily CDI index or history.
+            indice_ipca (IPCAIndex | pd.DataFrame): Monthly IPCA index or history.
+
+        Returns:
+            ModeloJuros: The fitted model.
+        """
+        indice_cdi = CDIIndex.from_historico(indice_cdi)
+        indice_ipca = IPCAIndex.from_historico(indice_ipca)
+
+        cdi_aa = ((1 + indice_cdi.taxas / 100) ** 252 - 1) * 100
+        cdi = pd.Series(cdi_aa, index=indice_cdi.datas.astype('datetime64[M]')).groupby(level=0).mean()
+        ipca = pd.Series(indice_ipca.taxas, index=indice_ipca.meses).groupby(level=0).mean()
+
+        constante, phi, residuos = [], [], []
+        for serie in (cdi, ipca):
+            x, y = serie.to_numpy()[:-1], serie.to_numpy()[1:]
+            b, a = np.polyfit(x, y, 1)
+            # sem raiz unitária: os caminhos voltam para a média
+            b = min(b, 0.99)
+            a = np.mean(y - b * x)
+            constante.append(a)
+            phi.append(b)
+            residuos.append(pd.Series(y - a - b * x, index=serie.index[1:]))
+
+        comum = residuos[0].index.intersection(residuos[1].index)
+        if len(comum) > 2:
+            covariancia = np.cov(residuos[0][comum], residuos[1][comum])
+        else:
+            covariancia = np.diag([residuos[0].var(), residuos[1].var()])
+        return cls(constante, phi, covariancia, [cdi_aa[-1], indice_ipca.taxas[-1]])
+
+    def simular(self, rng: np.random.Generator, caminhos: int, meses: int) -> tuple:
+        """
+        Simulates monthly paths.
+
+        Args:
+            rng (np.random.Generator): Random generator.
+            caminhos (int): Number of paths.
+            meses (int): Number of months.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: CDI (% a year) and IPCA (% a month), each (caminhos, meses).
+            The CDI is floored at 0.
+        """
+        choques = rng.multivariate_normal(np.zeros(2), self.covariancia, size=(caminhos, meses))
+        x = np.empty((caminhos, meses, 2))
+        anterior = np.broadcast_to(self.inicial, (caminhos, 2))
+        for m in range(meses):
+            anterior = self.constante + self.phi * anterior + choques[:, m]
+            anterior[:, 0] = np.maximum(anterior[:, 0], 0.0)
+            x[:, m] = anterior
+        return x[:, :, 0], x[:, :, 1]
+
+
+def preparar(ativo: pd.DataFrame, indice_ipca, indice_cdi) -> dict:
+    """
+    Everything the paths need, computed once: the monthly grid, the business days
+    of each position in each month, the value of each position at the last CDI
+    date (data base) and the groups of the output.
+
+    Args:
+        ativo (pd.DataFrame): Active positions (typed dates, see transform).
+        indice_ipca (IPCAIndex | pd.DataFrame): IPCA index or history.
+        indice_cdi (CDIIndex | pd.DataFrame): CDI index or history.
+
+    Returns:
+        dict: Simulation context (arrays only, cheap to send to the worker processes).
+    """
+    indice_cdi = CDIIndex.from_historico(indice_cdi)
+    indice_ipca = IPCAIndex.from_historico(indice_ipca)
+    ativo = ativo[ativo['DATA_RESGATE'].notna()]
+    calendario = calendario_br()
+
+    data_base = indice_cdi.ultima_data
+    resgate = np.maximum(to_days(ativo['DATA_RESGATE']), data_base)
+    data_inicio = to_days(ativo['DATA_INICIO'])
+
+    # Grade mensal: do primeiro mês de IPCA não publicado ao mês do último resgate
+    primeiro = min(indice_ipca.ultimo_mes + 1, data_base.astype('datetime64[M]'))
+    meses = np.arange(primeiro, resgate.max().astype('datetime64[M]') + 1)
+    inicio_mes = meses.astype('datetime64[D]')
+    fim_mes = (meses + 1).astype('datetime64[D]')
+    du_mes = np.busday_count(inicio_mes, fim_mes, busdaycal=calendario)
+    du_cdi = np.busday_count(np.maximum(inicio_mes, data_base), np.maximum(fim_mes, data_base), busdaycal=calendario)
+
+    mes_resgate = np.searchsorted(meses, resgate.astype('datetime64[M]'))
+    inicio_resgate = inicio_mes[mes_resgate]
+    du_final_cdi = np.busday_count(np.maximum(inicio_resgate, data_base), resgate, busdaycal=calendario)
+    du_final_ipca = np.busday_count(inicio_resgate, resgate, busdaycal=calendario)
+    du_restantes = np.busday_count(data_base, resgate, busdaycal=calendario)
+
+    aporte = ativo['APORTE'].to_numpy(dtype=float)
+    valor_base = aporte * calc_cumulative_rate_matrix(ativo, [data_base], indice_ipca, indice_cdi)[:, 0]
+
+    objetivo_codigo, objetivos = pd.factorize(ativo['OBJETIVO'])
+    chave_resgate = pd.Series(resgate.astype('datetime64[M]')).dt.strftime('%Y-%m').to_numpy()
+    resgate_codigo, chaves_resgate = pd.factorize(chave_resgate, sort=True)
+
+    return {
+        'meses': meses, 'du_mes': du_mes, 'du_cdi': du_cdi,
+        'mes_resgate': mes_resgate, 'du_final_cdi': du_final_cdi, 'du_final_ipca': du_final_ipca,
+        'du_restantes': du_restantes, 'valor_base': valor_base, 'aporte': aporte,
+        'tipo': ativo['TIPO_RENDIMENTO'].to_numpy(dtype=object),
+        'tipo_papel': ativo['TIPO_PAPEL'].to_numpy(dtype=object),
+        'taxa': ativo['TAXA_AA'].to_numpy(dtype=float),
+        'dias': (resgate - data_inicio).astype(int),
+        'grupos': {'OBJETIVO': (objetivo_codigo, list(objetivos)),
+                   'RESGATE': (resgate_codigo, list(chaves_resgate))},
+    }
+
+
+def fatores_futuros(contexto: dict, cdi_aa: np.ndarray, ipca_am: np.ndarray) -> np.ndarray:
+    """
+    Gross factor of each position from the data base to its redemption along each
+    path, (caminhos, posições). Each path is accumulated once per distinct
+    CDI percentage (cumulative sums over the months) and each position reads its
+    redemption month from them.
+    """
+    tipo, taxa, mes = contexto['tipo'], contexto['taxa'], contexto['mes_resgate']
+    fatores = np.ones((cdi_aa.shape[0], len(tipo)))
+
+    cdi_diario = (1 + cdi_aa / 100) ** (1 / 252) - 1
+    cdi = tipo == 'CDI'
+    for pct in np.unique(taxa[cdi]):
+        posicoes = np.flatnonzero(cdi & (taxa == pct))
+        log_dia = np.log1p(pct * cdi_diario)
+        acumulado = np.concatenate([np.zeros((len(cdi_aa), 1)), np.cumsum(contexto['du_cdi'] * log_dia, axis=1)], axis=1)
+        m = mes[posicoes]
+        fatores[:, posicoes] = np.exp(acumulado[:, m] + contexto['du_final_cdi'][posicoes] * log_dia[:, m])
+
+    ipca = np.flatnonzero(tipo == 'IPCA+taxa')
+    if len(ipca):
+        log_mes = np.log1p(ipca_am / 100)
+        acumulado = np.concatenate([np.zeros((len(ipca_am), 1)), np.cumsum(log_mes, axis=1)], axis=1)
+        m = mes[ipca]
+        fracao = contexto['du_final_ipca'][ipca] / contexto['du_mes'][m]
+        fixa = (1 + taxa[ipca]) ** (contexto['du_restantes'][ipca] / 252)
+        fatores[:, ipca] = np.exp(acumulado[:, m] + fracao * log_mes[:, m]) * fixa
+
+    pre = np.flatnonzero(tipo == 'Pré')
+    fatores[:, pre] = (1 + taxa[pre]) ** (contexto['du_restantes'][pre] / 252)
+    return fatores
+
+
+def _somar_grupos(valores: np.ndarray, codigos: np.ndarray, n_grupos: int) -> np.ndarray:
+    """Sums the columns of valores (caminhos, posições) by group code -> (caminhos, grupos)."""
+    somas = np.zeros((valores.shape[0], n_grupos))
+    validos = codigos >= 0
+    ordem = np.argsort(codigos[validos], kind='stable')
+    codigos_ordenados = codigos[validos][ordem]
+    if len(ordem):
+        inicios = np.flatnonzero(np.r_[True, np.diff(codigos_ordenados) != 0])
+        somas[:, codigos_ordenados[inicios]] = np.add.reduceat(valores[:, validos][:, ordem], inicios, axis=1)
+    return somas
+
+
+def simular_bloco(contexto: dict, modelo: ModeloJuros, semente, caminhos: int) -> dict:
+    """
+    Simulates `caminhos` paths and values every position at its redemption on each
+    of them. Only the sums per group leave the block, so memory is bounded by
+    caminhos x positions.
+
+    Returns:
+        dict: {(grupo, 'BRUTO'|'LIQUIDO'): array (caminhos, chaves)}, plus ('TOTAL', ...).
+    """
+    rng = np.random.default_rng(semente)
+    cdi_aa, ipca_am = modelo.simular(rng, caminhos, len(contexto['meses']))
+    bruto = contexto['valor_base'] * fatores_futuros(contexto, cdi_aa, ipca_am)
+    liquido = calc_valor_liquido_bulk(contexto['tipo_papel'], contexto['aporte'], bruto, contexto['dias'])
+
+    somas = {('TOTAL', 'BRUTO'): bruto.sum(axis=1, keepdims=True),
+             ('TOTAL', 'LIQUIDO'): liquido.sum(axis=1, keepdims=True)}
+    for grupo, (codigos, chaves) in contexto['grupos'].items():
+        somas[(grupo, 'BRUTO')] = _somar_grupos(bruto, codigos, len(chaves))
+        somas[(grupo, 'LIQUIDO')] = _somar_grupos(liquido, codigos, len(chaves))
+    return somas
+
+
+def _iniciar(contexto: dict, modelo: ModeloJuros):
+    """Pool initializer: keeps the simulation context once per process."""
+    _contexto['contexto'], _contexto['modelo'] = contexto, modelo
+
+
+def _simular(semente, caminhos: int) -> dict:
+    return simular_bloco(_contexto['contexto'], _contexto['modelo'], semente, caminhos)
+
+
+def simular(ativo: pd.DataFrame, indice_ipca, indice_cdi, caminhos: int = 5000, seed: int = 0,
+            caminhos_por_bloco: int = CAMINHOS_POR_BLOCO, max_workers: int = None,
+            modelo: ModeloJuros = None) -> pd.DataFrame:
+    """
+    Monte Carlo of the portfolio value at redemption: CDI and IPCA paths from a
+    ModeloJuros fitted to the history, every position valued on every path, and
+    percentile bands of the gross and net value in total, per OBJETIVO and per
+    redemption month.
+
+    The paths are simulated in blocks of caminhos_por_bloco across processes.
+    Each block has its own seed spawned from `seed` (np.random.SeedSequence), so
+    the result depends on seed and the block size, not on the number of processes.
+
+    Args:
+        ativo (pd.DataFrame): Active positions (typed dates, see transform).
+        indice_ipca (IPCAIndex | pd.DataFrame): IPCA index or history.
+        indice_cdi (CDIIndex | pd.DataFrame): CDI index or history.
+        caminhos (int): Number of paths.
+        seed (int): Seed of the simulation.
+        caminhos_por_bloco (int): Paths per task.
+        max_workers (int): Number of processes (default: number of CPUs; 1 runs in this process).
+        modelo (ModeloJuros): Rate model (default: fitted to the indexes).
+
+    Returns:
+        pd.DataFrame: DIMENSAO ('TOTAL', 'OBJETIVO' or 'RESGATE', as YYYY-MM), CHAVE,
+        VALOR ('BRUTO' or 'LIQUIDO'), MEDIA and one column per percentile (P5 ... P95).
+    """
+    colunas = ['DIMENSAO', 'CHAVE', 'VALOR', 'MEDIA'] + [f'P{p}' for p in PERCENTIS]
+    # sem posição com DATA_RESGATE não há grade de meses a simular (preparar precisa de ao menos uma)
+    if not ativo['DATA_RESGATE'].notna().any() or caminhos <= 0:
+        return pd.DataFrame(columns=colunas)
+    contexto = preparar(ativo, indice_ipca, indice_cdi)
+    modelo = modelo or ModeloJuros.ajustar(indice_cdi, indice_ipca)
+
+    tamanhos = [min(caminhos_por_bloco, caminhos - inicio) for inicio in range(0, caminhos, caminhos_por_bloco)]
+    sementes = np.random.SeedSequence(seed).spawn(len(tamanhos))
+
+    if (max_workers or os.cpu_count() or 1) == 1 or len(tamanhos) == 1:
+        blocos = [simular_bloco(contexto, modelo, s, n) for s, n in zip(sementes, tamanhos)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_iniciar,
+                                 initargs=(contexto, modelo)) as pool:
+            blocos = list(pool.map(_simular, sementes, tamanhos))
+
+    chaves = {'TOTAL': ['TOTAL'], **{g: c for g, (_, c) in contexto['grupos'].items()}}
+    linhas = []
+    for (dimensao, valor) in blocos[0]:
+        somas = np.concatenate([bloco[(dimensao, valor)] for bloco in blocos])
+        faixas = np.percentile(somas, PERCENTIS, axis=0)
+        for j, chave in enumerate(chaves[dimensao]):
+            linhas.append([dimensao, chave, valor, somas[:, j].mean()] + list(faixas[:, j]))
+    return pd.DataFrame(linhas, columns=colunas)
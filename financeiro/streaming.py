@@ -0,0 +1,74 @@
+import logging
+
+import pandas as pd
+
+from financeiro.agregacao import juntar, parcial
+from financeiro.schema import DTYPES_LEITURA, relatar_violacoes, validar
+from financeiro.transform import derivar_colunas, filtrar_ativos, formatos_datas, normalizar_datas
+from financeiro.valuation import valorar_ativos
+
+
+#   Tipos fixos na leitura (schema da carteira), para que todos os blocos tenham as mesmas colunas e dtypes
+DTYPES = DTYPES_LEITURA
+
+#   Linhas do arquivo de investimentos lidas por vez
+TAMANHO_BLOCO = 100_000
+
+
+def ler_em_blocos(caminho: str, colunas: list = None, tamanho_bloco: int = TAMANHO_BLOCO):
+    """
+    Reads the ledger (semicolon CSV) in chunks of tamanho_bloco rows.
+
+    Args:
+        caminho (str): Path of the ledger.
+        colunas (list): Columns to read (e.g. names_raw; default: all).
+        tamanho_bloco (int): Rows per chunk.
+
+    Returns:
+        Iterator of pd.DataFrame: The chunks, indexed by their row number in the file.
+    """
+    dtypes = {c: t for c, t in DTYPES.items() if colunas is None or c in colunas}
+    return pd.read_csv(caminho, sep=';', usecols=colunas, dtype=dtypes, chunksize=tamanho_bloco)
+
+
+def processar_em_blocos(caminho: str, data_fim, indice_ipca, indice_cdi, colunas: list = None,
+                        tamanho_bloco: int = TAMANHO_BLOCO, dia_corrente: str = None, saida=None) -> pd.DataFrame:
+    """
+    Streaming version of the pipeline: each chunk of the ledger is transformed,
+    filtered to the positions held at data_fim, valued at that date and folded
+    into the aggregation cube before the next chunk is read, so memory depends
+    on the chunk size and not on the size of the ledger. The date formats are inferred
+    from the first chunk and reused, so every chunk parses an ambiguous date
+    (d/m or m/d) the same way. The schema violations of all chunks are reported
+    together at the end, as when the whole ledger is validated.
+
+    finalizar() on the result gives the same tables as agregar() on the whole ledger.
+
+    Args:
+        caminho (str): Path of the ledger.
+        data_fim: Valuation date.
+        indice_ipca (IPCAIndex | pd.DataFrame): IPCA index or history.
+        indice_cdi (CDIIndex | pd.DataFrame): CDI index or history.
+        colunas (list): Columns to read (e.g. names_raw; default: all).
+        tamanho_bloco (int): Rows per chunk.
+        dia_corrente (str): Reference date for SITUACAO (default: today, fixed for the whole run).
+        saida (SaidaIncremental): Receives the valued active positions of each chunk.
+
+    Returns:
+        pd.DataFrame: The aggregation cube (see agregacao.parcial).
+    """
+    dia_corrente = dia_corrente or pd.Timestamp.now().strftime('%Y-%m-%d')
+    cubo = juntar([])
+    formatos = None
+    violacoes = []
+    for bloco in ler_em_blocos(caminho, colunas, tamanho_bloco):
+        formatos = formatos or formatos_datas(bloco)
+        df, violacoes_bloco = validar(normalizar_datas(bloco, formatos), nivel=logging.DEBUG)
+        violacoes.append(violacoes_bloco)
+        ativo = valorar_ativos(filtrar_ativos(derivar_colunas(df, dia_corrente), data_fim), data_fim, indice_ipca, indice_cdi)
+        if saida is not None:
+            saida.write(ativo)
+        cubo = juntar([cubo, parcial(ativo)])
+    if violacoes:
+        relatar_violacoes(pd.concat(violacoes, ignore_index=True))
+    return cubo
@@ -0,0 +1,146 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from financeiro.datas import formatos_coluna, parse_date_column
+from financeiro.historico import em_carteira
+from financeiro.schema import OBRIGATORIAS, SITUACOES, validar
+
+logger = logging.getLogger(__name__)
+
+
+#   Valor de DATA_RESGATE que marca uma posição resgatada sem data
+SENTINELA_RESGATADO = 'Resgatado'
+
+#   Colunas de data do arquivo e os valores delas que não são datas
+COLUNAS_DATA = {'DATA_INICIO': (), 'DATA_RESGATE': (SENTINELA_RESGATADO,)}
+
+
+def formatos_datas(df: pd.DataFrame) -> dict:
+    """
+    Date formats of each column of COLUNAS_DATA, most likely first, inferred from
+    df (e.g. the first chunk of a ledger read in chunks).
+
+    Returns:
+        dict: {coluna: formatos}, for normalizar_datas/transform.
+    """
+    return {coluna: formatos_coluna(df[coluna], ignorar=sentinelas) for coluna, sentinelas in COLUNAS_DATA.items()}
+
+
+def normalizar_datas(df: pd.DataFrame, formatos: dict = None, nivel: int = logging.WARNING) -> pd.DataFrame:
+    """
+    Converts DATA_INICIO and DATA_RESGATE to datetime64, once. The 'Resgatado'
+    sentinel becomes NaT in DATA_RESGATE and True in the RESGATADO column. Rows
+    with an unparseable date or an empty DATA_INICIO are reported and dropped.
+
+    Args:
+        df (pd.DataFrame): Ledger with the names_raw columns.
+        formatos (dict): Date formats per column (see formatos_datas); default:
+            inferred from df.
+        nivel (int): Log level of the invalid dates report.
+
+    Returns:
+        pd.DataFrame: The ledger with typed dates and RESGATADO.
+    """
+    df = df.copy()
+    df['RESGATADO'] = df['DATA_RESGATE'].astype(object).map(str).str.strip().eq(SENTINELA_RESGATADO)
+
+    linhas_invalidas=pd.Index([])
+    for coluna, sentinelas in COLUNAS_DATA.items():
+        obrigatoria = coluna in OBRIGATORIAS
+        if formatos is None:
+            datas, invalidos = parse_date_column(df[coluna], ignorar=sentinelas, obrigatoria=obrigatoria)
+        else:
+            datas, invalidos = parse_date_column(df[coluna], formatos[coluna], ignorar=sentinelas, inferir=False,
+                                                 obrigatoria=obrigatoria)
+        if not invalidos.empty:
+            logger.log(nivel, "%d linha(s) com %s inválida ou vazia:\n%s", len(invalidos), coluna, invalidos.astype(str).to_string())
+            linhas_invalidas=linhas_invalidas.union(invalidos.index)
+        df[coluna] = datas
+
+    # Linhas sem data válida ficam fora do cálculo
+    return df.drop(index=linhas_invalidas)
+
+
+def dia_referencia(dia_corrente=None) -> pd.Timestamp:
+    """dia_corrente as a Timestamp at midnight (default: today)."""
+    return pd.Timestamp(dia_corrente if dia_corrente is not None else pd.Timestamp.now()).normalize()
+
+
+def adicionar_situacao(df: pd.DataFrame, dia_corrente=None) -> pd.DataFrame:
+    """
+    Adds SITUACAO: 'Resgatado' if DATA_RESGATE is on or before dia_corrente
+    (default: today) or the position is flagged RESGATADO, otherwise 'Ativo'.
+    """
+    resgatado = df['RESGATADO'] | (df['DATA_RESGATE'] <= dia_referencia(dia_corrente))
+    df['SITUACAO'] = pd.Categorical.from_codes(np.asarray(resgatado, dtype='int8'), categories=SITUACOES)
+    return df
+
+
+def adicionar_ano_mes_resgate(df: pd.DataFrame) -> pd.DataFrame:
+    """Adds ANO_RESGATE and MES_RESGATE from DATA_RESGATE (empty when it has no date)."""
+    df['ANO_RESGATE'] = df['DATA_RESGATE'].dt.year.astype('Int16')
+    df['MES_RESGATE'] = df['DATA_RESGATE'].dt.month.astype('Int16')
+    return df
+
+
+def adicionar_prazos(df: pd.DataFrame, dia_corrente=None) -> pd.DataFrame:
+    """
+    Adds DIAS_EM_CARTEIRA (calendar days since DATA_INICIO) and DIAS_ATE_VENCIMENTO
+    (calendar days until DATA_RESGATE, empty when it has no date), both at dia_corrente.
+    """
+    dia = dia_referencia(dia_corrente)
+    df['DIAS_EM_CARTEIRA'] = (dia - df['DATA_INICIO']).dt.days.astype('Int32')
+    df['DIAS_ATE_VENCIMENTO'] = (df['DATA_RESGATE'] - dia).dt.days.astype('Int32')
+    return df
+
+
+def derivar_colunas(df: pd.DataFrame, dia_corrente=None) -> pd.DataFrame:
+    """
+    Derived columns of the ledger, as column expressions on the typed dates:
+    SITUACAO, ANO_RESGATE/MES_RESGATE, DIAS_EM_CARTEIRA and DIAS_ATE_VENCIMENTO.
+
+    Args:
+        df (pd.DataFrame): Output of normalizar_datas.
+        dia_corrente: Reference date (default: today).
+
+    Returns:
+        pd.DataFrame: df with the derived columns (changed in place).
+    """
+    dia = dia_referencia(dia_corrente)
+    df = adicionar_situacao(df, dia)
+    df = adicionar_ano_mes_resgate(df)
+    return adicionar_prazos(df, dia)
+
+
+def transform(raw: pd.DataFrame, dia_corrente=None, formatos: dict = None) -> pd.DataFrame:
+    """
+    Transform step of the pipeline: typed dates, schema validation (rows that
+    cannot be valued are dropped) and the derived columns. Invalid dates and
+    schema violations are logged only at DEBUG: callers that read a ledger
+    report them once at ingestion (normalizar_datas, schema.validar), so
+    repeated calls on the same data (benchmarks) don't repeat the report.
+
+    Args:
+        raw (pd.DataFrame): Ledger as read from InvestNovo_*.csv.
+        dia_corrente: Reference date for SITUACAO and the day counts (default: today).
+        formatos (dict): Date formats per column (see formatos_datas; default: inferred from raw).
+
+    Returns:
+        pd.DataFrame: The transformed ledger.
+    """
+    df, _ = validar(normalizar_datas(raw, formatos, logging.DEBUG), nivel=logging.DEBUG)
+    return derivar_colunas(df, dia_corrente)
+
+
+def filtrar_ativos(df: pd.DataFrame, data=None) -> pd.DataFrame:
+    """
+    Positions with SITUACAO 'Ativo' or, given a valuation date, the positions in
+    the portfolio at that date (historico.em_carteira, not flagged RESGATADO),
+    whatever their SITUACAO today: a past date also gets the positions that have
+    matured since, and none that started after it.
+    """
+    if data is None:
+        return df[df['SITUACAO']=="Ativo"].copy()
+    return df[~df['RESGATADO'].to_numpy() & em_carteira(df, [data])[:, 0]].copy()
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+from financeiro.calendario import dias_uteis, to_days
+from financeiro.impostos import valor_liquido
+from financeiro.indices import CDIIndex, IPCAIndex
+
+
+#   Maior diferença relativa aceita entre o fator em lote e o fator das funções
+#   calc_cumulative_rate_cdi linha a linha. O produto acumulado é refeito como soma
+#   de logaritmos, então a diferença fica na ordem de 1e-13; 1e-9 dá folga.
+#   IPCA+ segue o IPCAIndex (respeita data_fim e faz pro-rata por dias úteis), então
+#   não é comparável com calc_cumulative_rate_ipca, e Pré usa o calendario
+#   gerado por regra em vez da lista fixa de feriados.
+TOLERANCIA_RELATIVA = 1e-9
+
+
+def calc_cumulative_rate_pre_bulk(data_inicio: np.ndarray, data_fim, taxa_ano: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of calc_cumulative_rate_pre, counting business days
+    with the national holiday calendar (financeiro.calendario).
+
+    Args:
+    data_inicio (np.ndarray): Start dates as datetime64[D].
+    data_fim: End date (YYYY-MM-DD or datetime).
+    taxa_ano (np.ndarray): Annual rate of each position.
+
+    Returns:
+    np.ndarray: Cumulative factor of each position.
+    """
+    return (1 + taxa_ano) ** (dias_uteis(data_inicio, data_fim) / 252)
+
+
+def calc_cumulative_rate_matrix(ativo: pd.DataFrame, datas, indice_ipca, indice_cdi,
+                                validar: bool = False) -> np.ndarray:
+    """
+    Cumulative factor of every position at every date, as a positions x dates
+    matrix, grouping the positions by TIPO_RENDIMENTO.
+
+    Args:
+        ativo (pd.DataFrame): Positions with TIPO_RENDIMENTO, TAXA_AA and DATA_INICIO.
+        datas: Valuation dates.
+        indice_ipca (IPCAIndex | pd.DataFrame): IPCA index, or the IPCA history ('IPCA+taxa' column).
+        indice_cdi (CDIIndex | pd.DataFrame): CDI index, or the CDI history ('CDI' column).
+        validar (bool): Raise if some CDI period has no data (dates before DATA_INICIO
+            would raise, so only use it when every date is after every start).
+
+    Returns:
+        np.ndarray: Factors of shape (len(ativo), len(datas)); 0 for unknown types.
+    """
+    return _fatores(ativo, to_days(datas)[np.newaxis, :], indice_ipca, indice_cdi, validar)
+
+
+def calc_cumulative_rate_ate(ativo: pd.DataFrame, datas_fim, indice_ipca, indice_cdi,
+                             validar: bool = False) -> pd.Series:
+    """
+    Cumulative factor of each position up to its own end date (e.g. DATA_RESGATE).
+
+    Args:
+        ativo (pd.DataFrame): Positions with TIPO_RENDIMENTO, TAXA_AA and DATA_INICIO.
+        datas_fim: End date of each position, aligned with ativo.
+        indice_ipca (IPCAIndex | pd.DataFrame): IPCA index or history.
+        indice_cdi (CDIIndex | pd.DataFrame): CDI index or history.
+        validar (bool): Raise if some CDI period has no data.
+
+    Returns:
+        pd.Series: Cumulative factor aligned with ativo's index (0 for unknown types).
+    """
+    fatores = _fatores(ativo, to_days(datas_fim)[:, np.newaxis], indice_ipca, indice_cdi, validar)
+    return pd.Series(fatores[:, 0], index=ativo.index)
+
+
+def _fatores(ativo: pd.DataFrame, datas: np.ndarray, indice_ipca, indice_cdi, validar: bool) -> np.ndarray:
+    """Factors by TIPO_RENDIMENTO; datas is (1, D), shared by every position, or (len(ativo), 1)."""
+    fatores = np.zeros((len(ativo), datas.shape[1]))
+    if ativo.empty:
+        return fatores
+
+    tipo = ativo['TIPO_RENDIMENTO'].to_numpy()
+    taxa = ativo['TAXA_AA'].to_numpy(dtype=float)[:, np.newaxis]
+    data_inicio = to_days(ativo['DATA_INICIO'])[:, np.newaxis]
+
+    def fim(mask):
+        return datas if datas.shape[0] == 1 else datas[mask]
+
+    mask = tipo == 'CDI'
+    if mask.any():
+        fatores[mask] = CDIIndex.from_historico(indice_cdi).fator(data_inicio[mask], fim(mask), taxa[mask], validar)
+
+    mask = tipo == 'IPCA+taxa'
+    if mask.any():
+        fatores[mask] = IPCAIndex.from_historico(indice_ipca).fator(data_inicio[mask], fim(mask), taxa[mask])
+
+    mask = tipo == 'Pré'
+    if mask.any():
+        fatores[mask] = calc_cumulative_rate_pre_bulk(data_inicio[mask], fim(mask), taxa[mask])
+
+    return fatores
+
+
+def calc_cumulative_rate_bulk(ativo: pd.DataFrame, data_fim, indice_ipca, indice_cdi) -> pd.Series:
+    """
+    Calculates the cumulative factor of every position at once, grouping the
+    positions by TIPO_RENDIMENTO. Batch replacement for applying
+    calc_cumulative_rate_general row by row.
+
+    CDI factors match calc_cumulative_rate_cdi within TOLERANCIA_RELATIVA.
+
+    Args:
+        ativo (pd.DataFrame): Positions with TIPO_RENDIMENTO, TAXA_AA and DATA_INICIO.
+        data_fim: Valuation date (YYYY-MM-DD or datetime).
+        indice_ipca (IPCAIndex | pd.DataFrame): IPCA index, or the IPCA history ('IPCA+taxa' column).
+        indice_cdi (CDIIndex | pd.DataFrame): CDI index, or the CDI history ('CDI' column).
+
+    Returns:
+        pd.Series: Cumulative factor aligned with ativo's index (0 for unknown types).
+
+    Raises:
+        ValueError: If some CDI position has no data between its start date and data_fim.
+    """
+    fatores = calc_cumulative_rate_matrix(ativo, [data_fim], indice_ipca, indice_cdi, validar=True)
+    return pd.Series(fatores[:, 0], index=ativo.index)
+
+
+def calc_valor_liquido_bulk(tipo_papel, aporte, valor_bruto, dias) -> np.ndarray:
+    """
+    Vectorized net value: gross value minus IOF and regressive income tax, by the
+    rules of financeiro.impostos. Arguments are broadcast together.
+
+    Args:
+        tipo_papel: TIPO_PAPEL of each position.
+        aporte: Invested value.
+        valor_bruto: Gross value.
+        dias: Calendar days since DATA_INICIO.
+
+    Returns:
+        np.ndarray: Net value.
+    """
+    return valor_liquido(tipo_papel, aporte, valor_bruto, dias)
+
+
+def adicionar_valor_bruto(ativo: pd.DataFrame, data_fim: str, indice_ipca, indice_cdi) -> pd.DataFrame:
+    """Copy of ativo with VALOR_ATUAL_BRUTO (APORTE times the cumulative factor up to data_fim)."""
+    ativo = ativo.copy()
+    ativo['VALOR_ATUAL_BRUTO']=ativo['APORTE']*calc_cumulative_rate_bulk(ativo,data_fim,indice_ipca,indice_cdi)
+    return ativo
+
+
+def adicionar_valor_liquido(ativo: pd.DataFrame, data_fim: str) -> pd.DataFrame:
+    """Adds VALOR_ATUAL_LIQUIDO (VALOR_ATUAL_BRUTO after IOF and income tax) to ativo, in place."""
+    dias = (to_days(data_fim)[0] - to_days(ativo['DATA_INICIO'])).astype(int)
+    ativo['VALOR_ATUAL_LIQUIDO']=calc_valor_liquido_bulk(ativo['TIPO_PAPEL'].to_numpy(),ativo['APORTE'].to_numpy(),
+                                                         ativo['VALOR_ATUAL_BRUTO'].to_numpy(),dias)
+    return ativo
+
+
+def valorar_ativos(ativo: pd.DataFrame, data_fim: str, indice_ipca, indice_cdi) -> pd.DataFrame:
+    """
+    Adds VALOR_ATUAL_BRUTO and VALOR_ATUAL_LIQUIDO to the active positions.
+
+    Args:
+        ativo (pd.DataFrame): Active positions.
+        data_fim (str): Valuation date in YYYY-MM-DD format.
+        indice_ipca (IPCAIndex | pd.DataFrame): IPCA index or history.
+        indice_cdi (CDIIndex | pd.DataFrame): CDI index or history.
+
+    Returns:
+        pd.DataFrame: Copy of ativo with the two value columns.
+    """
+    return adicionar_valor_liquido(adicionar_valor_bruto(ativo,data_fim,indice_ipca,indice_cdi),data_fim)
@@ -0,0 +1,158 @@
+import streamlit as st
+import pandas as pd
+import os
+import sys
+
+# Camada de dados dos dashboards: cada arquivo é lido uma vez e os agregados
+# ficam em cache enquanto o arquivo e os filtros não mudarem.
+
+path_main_folder=os.path.dirname(os.path.realpath(__file__))    #onde fica o .py na distribuição
+path_folder_input=os.path.join(path_main_folder,'dados_entrada')
+
+# raiz do repositório no path, para os dashboards importarem o pacote financeiro
+if os.path.dirname(path_main_folder) not in sys.path:
+    sys.path.append(os.path.dirname(path_main_folder))
+
+from financeiro.agregacao import cubo_filtros, fatiar, histograma_taxas, parcial
+from financeiro.saida import tipar_saida
+
+
+def caminho_artifact(nome: str) -> str:
+    """
+    Path of an artifact written by main.py: the typed Parquet or the CSV export,
+    whichever was written last (the Parquet on a tie).
+
+    Args:
+        nome (str): Artifact name without extension (e.g. 'df_ativo').
+
+    Returns:
+        str: Path of the file.
+
+    Raises:
+        FileNotFoundError: If neither file exists.
+    """
+    caminhos = [os.path.join(path_folder_input, f'{nome}.{extensao}') for extensao in ('parquet', 'csv')]
+    existentes = [c for c in caminhos if os.path.exists(c)]
+    if not existentes:
+        raise FileNotFoundError(f"{nome} not found in {path_folder_input}")
+    # max devolve o primeiro entre os empatados: o Parquet
+    return max(existentes, key=lambda c: os.stat(c).st_mtime_ns)
+
+
+def assinatura(caminho: str) -> tuple:
+    """Identifies the current version of a file by its modification time and size."""
+    info = os.stat(caminho)
+    return (info.st_mtime_ns, info.st_size)
+
+
+def _aplicar_filtros(df: pd.DataFrame, filters) -> pd.DataFrame:
+    """Applies pyarrow-style filters [(coluna, op, valor)] to a frame read from CSV."""
+    operacoes = {'==': lambda c, v: c == v, '!=': lambda c, v: c != v,
+                 '<': lambda c, v: c < v, '<=': lambda c, v: c <= v,
+                 '>': lambda c, v: c > v, '>=': lambda c, v: c >= v,
+                 'in': lambda c, v: c.isin(v), 'not in': lambda c, v: ~c.isin(v)}
+    for coluna, op, valor in filters:
+        df = df[operacoes[op](df[coluna], valor)]
+    return df
+
+
+@st.cache_data(show_spinner=False)
+def _ler(caminho: str, versao: tuple, columns, filters) -> pd.DataFrame:
+    if caminho.endswith('.parquet'):
+        return pd.read_parquet(caminho, columns=columns, filters=filters)
+    # CSV exportado: mesmo schema do Parquet (categorias, datas, inteiros)
+    df = tipar_saida(pd.read_csv(caminho, sep=';'))
+    if filters:
+        df = _aplicar_filtros(df, filters)
+    return df if columns is None else df[list(columns)]
+
+
+def load_artifact(nome: str, columns: list = None, filters: list = None) -> pd.DataFrame:
+    """
+    Reads an artifact written by main.py. The file is parsed only when its
+    signature (mtime, size) changes; reruns get the cached frame. From Parquet
+    only the requested columns and the row groups that can match the filters
+    are read.
+
+    Args:
+        nome (str): Artifact name without extension (e.g. 'df_ativo').
+        columns (list): Columns to read (default: all).
+        filters (list): pyarrow-style filters, e.g. [('EMISSOR', 'in', ['Banco A'])].
+
+    Returns:
+        pd.DataFrame: The artifact.
+    """
+    caminho = caminho_artifact(nome)
+    return _ler(caminho, assinatura(caminho), columns, filters)
+
+
+@st.cache_data(show_spinner=False)
+def carregar_cubo(versao: tuple) -> tuple:
+    """
+    The filter cube and its rate histogram written by main.py (df_cubo and
+    df_cubo_taxas). Artifacts from before the histogram existed are rolled up
+    from df_ativo once per version.
+    """
+    try:
+        return load_artifact('df_cubo'), load_artifact('df_cubo_taxas')
+    except FileNotFoundError:
+        cubo = parcial(load_artifact('df_ativo'))
+        return cubo_filtros(cubo), histograma_taxas(cubo)
+
+
+@st.cache_data(show_spinner=False)
+def _filtrar(versao: tuple, l_bancos: tuple, l_produtos: tuple) -> dict:
+    # agregados saem do cubo: custo proporcional às combinações, não ao número de posições
+    cubo, taxas = carregar_cubo(versao)
+    filtrados = fatiar(cubo, {'EMISSOR': l_bancos, 'TIPO_PAPEL': l_produtos}, taxas)
+
+    # a tabela de detalhe é a única coisa que precisa das linhas: só as selecionadas são lidas
+    if l_bancos and l_produtos:
+        filtrados['ativo_filtered'] = load_artifact('df_ativo', filters=[('EMISSOR', 'in', list(l_bancos)),
+                                                                         ('TIPO_PAPEL', 'in', list(l_produtos))])
+    else:
+        # seleção vazia: nenhuma linha (o filtro 'in' do pyarrow não aceita lista vazia)
+        filtrados['ativo_filtered'] = load_artifact('df_ativo').iloc[:0]
+    return filtrados
+
+
+def filtrar_ativo(l_bancos: list, l_produtos: list) -> dict:
+    """
+    Dashboard aggregates for the sidebar selections, rolled up from the filter
+    cube (agregacao.fatiar), plus the filtered positions for the detail table,
+    read with the selections pushed down to the Parquet reader. Memoized by
+    (df_ativo version, selections).
+
+    Args:
+        l_bancos (list): Selected EMISSOR values.
+        l_produtos (list): Selected TIPO_PAPEL values.
+
+    Returns:
+        dict: 'ativo_filtered', 'df_taxa_media2', 'df_total2', 'df_dist_objetivo',
+        'por_tipo_rendimento' and 'por_emissor'.
+    """
+    return _filtrar(assinatura(caminho_artifact('df_ativo')), tuple(sorted(l_bancos)), tuple(sorted(l_produtos)))
+
+
+def carregar_fluxo_resgates() -> pd.DataFrame:
+    """
+    Projected net value received in each redemption month (df_fluxo_resgates),
+    pivoted like df_resgate_anomes: MES_RESGATE rows, one column per year.
+    Falls back to the APORTE-only df_resgate_anomes when there is no projection
+    or it is older than df_resgate_anomes (left by an earlier run, e.g. before a
+    --tamanho-bloco run, which doesn't project).
+
+    Returns:
+        pd.DataFrame: The pivot, with the years as string column names.
+    """
+    try:
+        caminho = caminho_artifact('df_fluxo_resgates')
+    except FileNotFoundError:
+        return load_artifact('df_resgate_anomes')
+    if os.stat(caminho).st_mtime_ns < os.stat(caminho_artifact('df_resgate_anomes')).st_mtime_ns:
+        return load_artifact('df_resgate_anomes')
+    fluxo = load_artifact('df_fluxo_resgates')
+    pivot = fluxo.pivot_table(index='MES_RESGATE', columns='ANO_RESGATE', values='VALOR_LIQUIDO_RESGATE',
+                              aggfunc='sum', observed=True)
+    pivot.columns = [str(c) for c in pivot.columns]
+    return pivot.reset_index()
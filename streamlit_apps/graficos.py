@@ -0,0 +1,196 @@
+import argparse
+import hashlib
+import io
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import pandas as pd
+from matplotlib.figure import Figure
+
+# Gráficos dos dashboards: cada figura é desenhada numa Figure própria (sem o
+# estado global do pyplot), convertida em imagem e liberada na hora. As imagens
+# ficam em cache pela impressão digital dos dados agregados e das opções, então
+# um rerun com os mesmos dados não desenha de novo.
+#
+# Sem o streamlit, gera todos os gráficos em arquivos:
+#   python streamlit_apps/graficos.py [--saida PASTA] [--formatos png svg] [--processos N]
+
+path_main_folder=os.path.dirname(os.path.realpath(__file__))    #onde fica o .py na distribuição
+path_folder_input=os.path.join(path_main_folder,'dados_entrada')
+
+# raiz do repositório no path, para importar o pacote financeiro
+if os.path.dirname(path_main_folder) not in sys.path:
+    sys.path.append(os.path.dirname(path_main_folder))
+
+from financeiro.agregacao import cubo_filtros, fatiar, histograma_taxas, parcial
+
+
+#   Imagens renderizadas guardadas em memória (as menos usadas saem primeiro)
+MAX_IMAGENS = 64
+
+_imagens = OrderedDict()
+
+
+@contextmanager
+def figura(figsize, dpi=100):
+    """A Figure not registered in pyplot, cleared when the block ends."""
+    fig = Figure(figsize=figsize, dpi=dpi)
+    try:
+        yield fig
+    finally:
+        fig.clear()
+
+
+def desenhar_barras(fig: Figure, dados: pd.Series, titulo: str = 'Sum of APORTE by EMISSOR',
+                    xlabel: str = 'Sum of APORTE', ylabel: str = 'EMISSOR'):
+    """Horizontal bars of dados (largest on top), with the value at the end of each bar."""
+    dados = dados.sort_values(ascending=False)
+    ax = fig.subplots()
+    bars = ax.barh([str(i) for i in dados.index], dados.to_numpy(), color='skyblue')
+    for bar in bars:
+        ax.text(bar.get_width(), bar.get_y() + bar.get_height() / 2, f'{bar.get_width():.2f}',
+                va='center', ha='left', fontsize=12, color='black')
+    ax.set_title(titulo, fontsize=16, weight='bold')
+    ax.set_xlabel(xlabel, fontsize=14)
+    ax.set_ylabel(ylabel, fontsize=14)
+    ax.invert_yaxis()
+
+
+def desenhar_donut(fig: Figure, dados: pd.Series, titulo: str = 'APORTE Distribution by TIPO_RENDIMENTO'):
+    """Donut of dados with the share of each group in the labels."""
+    percentuais = 100 * dados / dados.sum()
+    labels = [f'{label} ({percentual:.1f}%)' for label, percentual in zip(dados.index, percentuais)]
+    ax = fig.subplots()
+    _, textos = ax.pie(dados.to_numpy(), labels=labels, startangle=140, counterclock=False,
+                       wedgeprops=dict(width=0.5, edgecolor='w'))
+    for texto in textos:
+        texto.set_fontsize(14)
+    ax.set_title(titulo, fontsize=14, weight='bold')
+    ax.axis('equal')
+
+
+#   Gráficos conhecidos: (função de desenho, tamanho em polegadas)
+GRAFICOS = {
+    'barras': (desenhar_barras, (10, 6)),
+    'donut': (desenhar_donut, (8, 6)),
+}
+
+
+def chave_imagem(tipo: str, dados: pd.Series, formato: str, opcoes: dict) -> str:
+    """Fingerprint of a chart: type, format, options and the aggregated data (labels and values)."""
+    h = hashlib.sha1(repr((tipo, formato, sorted(opcoes.items()))).encode())
+    h.update(pd.util.hash_pandas_object(dados, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def renderizar(tipo: str, dados: pd.Series, formato: str = 'png', **opcoes) -> bytes:
+    """
+    Renders a dashboard chart to an image, reusing the cached image when the
+    aggregated data and the options are the same.
+
+    Args:
+        tipo (str): Chart in GRAFICOS ('barras' or 'donut').
+        dados (pd.Series): Aggregated values indexed by label (e.g. APORTE per EMISSOR).
+        formato (str): Image format ('png' or 'svg').
+        **opcoes: Options of the drawing function (titulo, xlabel, ...).
+
+    Returns:
+        bytes: The image.
+    """
+    chave = chave_imagem(tipo, dados, formato, opcoes)
+    if chave in _imagens:
+        _imagens.move_to_end(chave)
+        return _imagens[chave]
+
+    desenhar, tamanho = GRAFICOS[tipo]
+    buffer = io.BytesIO()
+    with figura(tamanho) as fig:
+        desenhar(fig, dados, **opcoes)
+        fig.savefig(buffer, format=formato, bbox_inches='tight')
+    imagem = buffer.getvalue()
+
+    _imagens[chave] = imagem
+    if len(_imagens) > MAX_IMAGENS:
+        _imagens.popitem(last=False)
+    return imagem
+
+
+def _ler_artifact(pasta: str, nome: str):
+    """Artifact from pasta (the Parquet or the CSV export, whichever is newer), or None."""
+    caminhos = [os.path.join(pasta, f'{nome}.{extensao}') for extensao in ('parquet', 'csv')]
+    existentes = [c for c in caminhos if os.path.exists(c)]
+    if not existentes:
+        return None
+    caminho = max(existentes, key=lambda c: os.stat(c).st_mtime_ns)
+    return pd.read_parquet(caminho) if caminho.endswith('.parquet') else pd.read_csv(caminho, sep=';')
+
+
+def dados_graficos(pasta: str = path_folder_input) -> dict:
+    """
+    Aggregated input of every dashboard chart, from the filter cube in pasta
+    (rolled up from df_ativo when there is no cube and rate histogram).
+
+    Returns:
+        dict: {nome do arquivo: (tipo, dados)}.
+    """
+    cubo, taxas = _ler_artifact(pasta, 'df_cubo'), _ler_artifact(pasta, 'df_cubo_taxas')
+    if cubo is None or taxas is None:
+        ativo = _ler_artifact(pasta, 'df_ativo')
+        if ativo is None:
+            raise FileNotFoundError(f"df_cubo/df_ativo not found in {pasta}")
+        parciais = parcial(ativo)
+        cubo, taxas = cubo_filtros(parciais), histograma_taxas(parciais)
+    agregados = fatiar(cubo, {}, taxas)
+    return {'aporte_por_emissor': ('barras', agregados['por_emissor']),
+            'aporte_por_tipo_rendimento': ('donut', agregados['por_tipo_rendimento'])}
+
+
+def _exportar(nome: str, tipo: str, dados: pd.Series, formato: str, pasta: str) -> str:
+    caminho = os.path.join(pasta, f'{nome}.{formato}')
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(renderizar(tipo, dados, formato))
+    return caminho
+
+
+def exportar(pasta_saida: str, formatos=('png',), pasta_entrada: str = path_folder_input,
+             max_workers: int = None) -> list:
+    """
+    Renders every dashboard chart to files, one process per image.
+
+    Args:
+        pasta_saida (str): Output folder.
+        formatos: Image formats ('png', 'svg').
+        pasta_entrada (str): Folder of the artifacts written by main.py.
+        max_workers (int): Number of processes (default: number of CPUs).
+
+    Returns:
+        list: Paths of the written files.
+    """
+    os.makedirs(pasta_saida, exist_ok=True)
+    tarefas = [(nome, tipo, dados, formato, pasta_saida)
+               for nome, (tipo, dados) in dados_graficos(pasta_entrada).items() for formato in formatos]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_exportar, *zip(*tarefas)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera os gráficos dos dashboards em arquivos, sem o streamlit.")
+    parser.add_argument('--entrada', default=path_folder_input,
+                        help="pasta dos artefatos gerados pelo main.py (default: %(default)s)")
+    parser.add_argument('--saida', default=os.path.join(path_main_folder,'graficos'),
+                        help="pasta das imagens (default: %(default)s)")
+    parser.add_argument('--formatos', nargs='+', default=['png'], choices=['png', 'svg'],
+                        help="formatos das imagens (default: %(default)s)")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="número de processos (default: número de CPUs)")
+    args = parser.parse_args(argv)
+
+    for caminho in exportar(args.saida, args.formatos, args.entrada, args.processos):
+        print(caminho)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,10 @@ import pandas as pd
 import numpy as np
 import os
 
-# to do: definir os gráficos na seção adequada
+from dados import carregar_fluxo_resgates, load_artifact
+from graficos import renderizar
 
-# graph section
-import matplotlib.pyplot as plt
+# to do: definir os gráficos na seção adequada
 
 def background_color(val):
     color = 'green' if val>=10000 else 'grey'
@@ -44,16 +44,16 @@ data = {
 }
 
 
-ativo = pd.read_csv(os.path.join(path_folder_input,"df_ativo.csv"),sep=';')
+ativo = load_artifact("df_ativo")
 #
-df_taxa_media =pd.read_csv(os.path.join(path_folder_input,"df_taxa_media.csv"),sep=';')
+df_taxa_media =load_artifact("df_taxa_media")
 df_taxa_media['TAXA_AA']=df_taxa_media['TAXA_AA']*100
 
 #
-df_total=pd.read_csv(os.path.join(path_folder_input,"df_total.csv"),sep=';')
+df_total=load_artifact("df_total")
 
 #
-df_resgate_anomes=pd.read_csv(os.path.join(path_folder_input,"df_resgate_anomes.csv"),sep=';')
+df_resgate_anomes=carregar_fluxo_resgates()
 
 #
 ativo_sorted = ativo.sort_values(by='DATA_RESGATE', ascending=True)
@@ -74,68 +74,9 @@ vb_rentabilidade=(vb_patrimonio.iloc[0]-vb_patrimonio_aporte.iloc[0])
 #   =========================== SETTING GRAPHS
 #   =======================================================================
 
-#   HORIZONTAL BAR PLOT
-
-    # Group by 'EMISSOR' and sum 'APORTE'
-grouped_data = ativo.groupby("EMISSOR")['APORTE'].sum()
-
-    # Sort the data in descending order
-sorted_data = grouped_data.sort_values(ascending=False)
-
-    # Prepare the labels and sizes for the bar plot
-labels = sorted_data.index
-sizes = sorted_data.values
-
-    # Create the horizontal bar plot
-fig_01, ax01 = plt.subplots(figsize=(10, 6), dpi=100)
-bars = ax01.barh(labels, sizes, color='skyblue')
-
-    # Add value labels at the end of each bar
-for bar in bars:
-    ax01.text(
-        bar.get_width(),                        # X-coordinate for the text (end of the bar)
-        bar.get_y() + bar.get_height() / 2,     # Y-coordinate for the text (center of the bar)
-        f'{bar.get_width():.2f}',               # Text to display (value of the bar)
-        va='center',                            # Vertical alignment
-        ha='left',                              # Horizontal alignment
-        fontsize=12,                            # Font size of the text
-        color='black'                           # Color of the text
-    )
-
-    # Set the title and labels
-plt.title('Sum of APORTE by EMISSOR', fontsize=16, weight='bold')
-ax01.set_xlabel('Sum of APORTE', fontsize=14)
-ax01.set_ylabel('EMISSOR', fontsize=14)
-
-# Invert the y-ax01is to have the largest bar on top
-ax01.invert_yaxis()
-
-
-    # Group by 'TIPO_RENDIMENTO' and sum 'APORTE'
-grouped_data = ativo.groupby("TIPO_RENDIMENTO")['APORTE'].sum()
-
-    # Calculate the percentage for each group
-percentages = 100 * grouped_data / grouped_data.sum()
-
-    # Prepare the labels with percentages
-labels = [f'{label} ({percentage:.1f}%)' for label, percentage in zip(grouped_data.index, percentages)]
-sizes = grouped_data.values
-
-    # Create the donut plot
-fig_02, ax02 = plt.subplots(figsize=(8, 6), dpi=100)
-wedges, texts = ax02.pie(
-    sizes, labels=labels, startangle=140, counterclock=False,
-    wedgeprops=dict(width=0.5, edgecolor='w')  # width controls the thickness of the donut
-)
-
-    # Customize the label font size
-plt.setp(texts, size=14)  # Increase font size here
-
-    # Set the title
-plt.title('APORTE Distribution by TIPO_RENDIMENTO', fontsize=14, weight='bold')
-
-    # Equal aspect ratio ensures that pie is drawn as a circle.
-ax02.axis('equal')
+# imagens saem do cache de graficos enquanto os agregados não mudarem
+fig_01=renderizar('barras', ativo.groupby("EMISSOR", observed=True)['APORTE'].sum())
+fig_02=renderizar('donut', ativo.groupby("TIPO_RENDIMENTO", observed=True)['APORTE'].sum())
 
 
 #   =======================================================================
@@ -152,11 +93,11 @@ with col2:
     st.metric(label='a colocar',value=8,delta=1)
 
 
-    st.pyplot(fig_02)
+    st.image(fig_02)
 with col3:
     st.metric(label='Teste',value=8,delta=1)
     st.dataframe(df_taxa_media)
     
 
-st.dataframe(df_resgate_anomes.style.applymap(background_color, subset=['2024','2025','2026','2027','2029']))
-st.pyplot(fig_01)
\ No newline at end of file
+st.dataframe(df_resgate_anomes.style.applymap(background_color, subset=[c for c in df_resgate_anomes.columns if c!='MES_RESGATE']))
+st.image(fig_01)
\ No newline at end of file